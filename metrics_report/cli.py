@@ -1,80 +1,200 @@
 from __future__ import annotations
 
 import argparse
+import importlib
 import json
 import logging
 import os
-import importlib.metadata as importlib_metadata
-from typing import Any, Iterable
+import sys
+from typing import Any, Callable
 
 try:
-    from dotenv import load_dotenv
+    import orjson
 except ModuleNotFoundError:  # pragma: no cover
-    load_dotenv = None
+    orjson = None
+
+
+def _bootstrap_env() -> None:
+    import importlib.metadata as importlib_metadata
+
+    if not hasattr(importlib_metadata, "packages_distributions"):
+        # Compatibility for Python < 3.10 (prevents noisy prints from google-api-core)
+        def _packages_distributions() -> dict[str, list[str]]:  # pragma: no cover
+            return {}
+
+        setattr(importlib_metadata, "packages_distributions", _packages_distributions)
+
+    try:
+        from dotenv import load_dotenv
+    except ModuleNotFoundError:  # pragma: no cover
+        return
+    load_dotenv(override=False)
 
-if not hasattr(importlib_metadata, "packages_distributions"):
-    # Compatibility for Python < 3.10 (prevents noisy prints from google-api-core)
-    def _packages_distributions() -> dict[str, list[str]]:  # pragma: no cover
-        return {}
 
-    setattr(importlib_metadata, "packages_distributions", _packages_distributions)
+_MAX_EXCEPTION_CHAIN_DEPTH = 32
 
+_UNRESOLVED: Any = object()
+_HTTP_ERROR_TYPE: Any = _UNRESOLVED
 
-def _iter_exception_chain(exc: BaseException) -> Iterable[BaseException]:
-    seen: set[int] = set()
+_ONLY_CHOICES: tuple[str, ...] = (
+    "shopify",
+    "shopify_funnel",
+    "customers",
+    "meta",
+    "meta_ads",
+    "google_ads",
+    "klaviyo",
+)
+
+
+def _find_in_exception_chain(
+    exc: BaseException, types: type[BaseException] | tuple[type[BaseException], ...]
+) -> BaseException | None:
     current: BaseException | None = exc
-    while current is not None and id(current) not in seen:
-        yield current
-        seen.add(id(current))
+    depth = 0
+    # The depth bound also guards against cyclic __cause__/__context__ chains.
+    while current is not None and depth < _MAX_EXCEPTION_CHAIN_DEPTH:
+        if isinstance(current, types):
+            return current
         current = current.__cause__ or current.__context__
+        depth += 1
+    return None
+
+
+# Parsed GOOGLE_APPLICATION_CREDENTIALS summaries keyed by (path, st_mtime_ns).
+_SA_SUMMARY_CACHE: dict[tuple[str, int], dict[str, str]] = {}
 
 
 def _load_google_application_credentials_summary() -> dict[str, str]:
     path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
     if not path:
         return {}
+    try:
+        key = (path, os.stat(path).st_mtime_ns)
+    except OSError:
+        return {}
+    cached = _SA_SUMMARY_CACHE.get(key)
+    if cached is not None:
+        return cached
+
     try:
         with open(path, "r", encoding="utf-8") as handle:
             payload = json.load(handle)
     except Exception:
-        return {}
+        payload = {}
     out: dict[str, str] = {}
-    for key in ("client_email", "project_id"):
-        value = payload.get(key)
-        if isinstance(value, str) and value.strip():
-            out[key] = value.strip()
+    if isinstance(payload, dict):
+        for field in ("client_email", "project_id"):
+            value = payload.get(field)
+            if isinstance(value, str) and value.strip():
+                out[field] = value.strip()
+    _SA_SUMMARY_CACHE[key] = out
     return out
 
 
-def _maybe_handle_google_sheets_http_error(exc: BaseException) -> bool:
+def _parse_error_content(content: Any) -> Any:
+    if orjson is not None and isinstance(content, (bytes, str)):
+        # orjson takes the raw bytes directly, skipping the decode step.
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            pass  # e.g. invalid UTF-8; retry leniently below.
+    if isinstance(content, bytes):
+        content_text = content.decode("utf-8", errors="replace")
+    else:
+        content_text = str(content or "")
     try:
-        from googleapiclient.errors import HttpError
-    except Exception:  # pragma: no cover
+        return json.loads(content_text)
+    except json.JSONDecodeError:
+        return {}
+
+
+def _project_flag(consumer: Any, *, fallback: Any = None) -> str | None:
+    if isinstance(consumer, str) and consumer:
+        return consumer.removeprefix("projects/")
+    return fallback if isinstance(fallback, str) and fallback else None
+
+
+def _log_sheets_service_disabled(metadata: dict[str, Any], message: str, summaries: dict[str, str]) -> None:
+    consumer = metadata.get("consumer") or metadata.get("containerInfo") or "tu proyecto"
+    if "requires a quota project" in message.lower():
+        logging.error(
+            "Tus credenciales ADC (usuario) requieren un quota project para usar Sheets API. "
+            "Solución: `gcloud auth application-default set-quota-project %s` "
+            "(o usa `GOOGLE_APPLICATION_CREDENTIALS=/ruta/service-account.json`). "
+            "Luego reintenta.",
+            _project_flag(consumer) or "PROJECT_ID",
+        )
+        return
+    activation_url = metadata.get("activationUrl")
+    project = summaries.get("project_id")
+    suffix = f" (project_id: {project})" if project else ""
+    project_flag = _project_flag(consumer, fallback=project)
+    enable_hint = (
+        f" Comando: `gcloud services enable sheets.googleapis.com --project {project_flag}`"
+        if project_flag
+        else ""
+    )
+    logging.error(
+        "Google Sheets API está deshabilitada para %s%s. "
+        "Habilítala y reintenta.%s %s",
+        consumer,
+        suffix,
+        enable_hint,
+        activation_url or "",
+    )
+
+
+def _log_sheets_scope_insufficient(metadata: dict[str, Any], message: str, summaries: dict[str, str]) -> None:
+    logging.error(
+        "Tus credenciales de Google no tienen scopes suficientes para Sheets. "
+        "Usa un Service Account con `GOOGLE_APPLICATION_CREDENTIALS=/ruta/key.json` "
+        "o re-autentica ADC con: "
+        "`gcloud auth application-default login "
+        "--scopes=https://www.googleapis.com/auth/cloud-platform,https://www.googleapis.com/auth/spreadsheets`."
+    )
+
+
+# ErrorInfo reasons from sheets.googleapis.com that get a tailored hint.
+_SHEETS_REASON_HANDLERS: dict[str, Callable[[dict[str, Any], str, dict[str, str]], None]] = {
+    "SERVICE_DISABLED": _log_sheets_service_disabled,
+    "ACCESS_TOKEN_SCOPE_INSUFFICIENT": _log_sheets_scope_insufficient,
+}
+
+
+def _google_http_error_type() -> type[BaseException] | None:
+    # Resolved on first use (not at import) so `--help`/`oauth` stay free of googleapiclient.
+    global _HTTP_ERROR_TYPE
+    if _HTTP_ERROR_TYPE is _UNRESOLVED:
+        try:
+            from googleapiclient.errors import HttpError
+        except Exception:  # pragma: no cover
+            HttpError = None  # type: ignore[assignment,misc]
+        _HTTP_ERROR_TYPE = HttpError
+    return _HTTP_ERROR_TYPE  # type: ignore[return-value]
+
+
+def _maybe_handle_google_sheets_http_error(exc: BaseException) -> bool:
+    http_error_type = _google_http_error_type()
+    if http_error_type is None:
         return False
 
-    http_error: HttpError | None = None
-    for candidate in _iter_exception_chain(exc):
-        if isinstance(candidate, HttpError):
-            http_error = candidate
-            break
+    http_error = _find_in_exception_chain(exc, http_error_type)
     if http_error is None:
         return False
 
     content: Any = getattr(http_error, "content", None)
-    if isinstance(content, bytes):
-        content_text = content.decode("utf-8", errors="replace")
-    else:
-        content_text = str(content or "")
-
-    try:
-        payload = json.loads(content_text)
-    except json.JSONDecodeError:
-        payload = {}
+    payload = _parse_error_content(content)
     error = payload.get("error") if isinstance(payload, dict) else None
     if not isinstance(error, dict):
         return False
 
-    details = error.get("details") if isinstance(error.get("details"), list) else []
+    details = error.get("details")
+    if not isinstance(details, list):
+        details = []
+    message = error.get("message")
+    if not isinstance(message, str):
+        message = ""
     summaries = _load_google_application_credentials_summary()
 
     for entry in details:
@@ -83,64 +203,18 @@ def _maybe_handle_google_sheets_http_error(exc: BaseException) -> bool:
         if entry.get("@type") != "type.googleapis.com/google.rpc.ErrorInfo":
             continue
         reason = entry.get("reason")
-        metadata = entry.get("metadata") if isinstance(entry.get("metadata"), dict) else {}
+        metadata = entry.get("metadata")
+        if not isinstance(metadata, dict):
+            metadata = {}
         if metadata.get("service") != "sheets.googleapis.com":
             continue
 
-        if reason == "SERVICE_DISABLED":
-            message = error.get("message") if isinstance(error.get("message"), str) else ""
-            if "requires a quota project" in message.lower():
-                consumer = metadata.get("consumer") or metadata.get("containerInfo") or "tu proyecto"
-                project_flag = None
-                if isinstance(consumer, str) and consumer.startswith("projects/"):
-                    project_flag = consumer.split("/", 1)[1]
-                elif isinstance(consumer, str) and consumer:
-                    project_flag = consumer
-                logging.error(
-                    "Tus credenciales ADC (usuario) requieren un quota project para usar Sheets API. "
-                    "Solución: `gcloud auth application-default set-quota-project %s` "
-                    "(o usa `GOOGLE_APPLICATION_CREDENTIALS=/ruta/service-account.json`). "
-                    "Luego reintenta.",
-                    project_flag or "PROJECT_ID",
-                )
-                return True
-            activation_url = metadata.get("activationUrl")
-            consumer = metadata.get("consumer") or metadata.get("containerInfo") or "tu proyecto"
-            project = summaries.get("project_id")
-            suffix = f" (project_id: {project})" if project else ""
-            project_flag = None
-            if isinstance(consumer, str) and consumer.startswith("projects/"):
-                project_flag = consumer.split("/", 1)[1]
-            elif isinstance(consumer, str) and consumer:
-                project_flag = consumer
-            elif isinstance(project, str) and project:
-                project_flag = project
-            enable_hint = (
-                f" Comando: `gcloud services enable sheets.googleapis.com --project {project_flag}`"
-                if project_flag
-                else ""
-            )
-            logging.error(
-                "Google Sheets API está deshabilitada para %s%s. "
-                "Habilítala y reintenta.%s %s",
-                consumer,
-                suffix,
-                enable_hint,
-                activation_url or "",
-            )
-            return True
-
-        if reason == "ACCESS_TOKEN_SCOPE_INSUFFICIENT":
-            logging.error(
-                "Tus credenciales de Google no tienen scopes suficientes para Sheets. "
-                "Usa un Service Account con `GOOGLE_APPLICATION_CREDENTIALS=/ruta/key.json` "
-                "o re-autentica ADC con: "
-                "`gcloud auth application-default login "
-                "--scopes=https://www.googleapis.com/auth/cloud-platform,https://www.googleapis.com/auth/spreadsheets`."
-            )
-            return True
+        handler = _SHEETS_REASON_HANDLERS.get(reason)
+        if handler is None:
+            continue
+        handler(metadata, message, summaries)
+        return True
 
-    message = error.get("message") if isinstance(error.get("message"), str) else ""
     if "The caller does not have permission" in message:
         email = summaries.get("client_email")
         hint = f" (service account: {email})" if email else ""
@@ -154,54 +228,90 @@ def _maybe_handle_google_sheets_http_error(exc: BaseException) -> bool:
     return False
 
 
-def main(argv: list[str] | None = None) -> int:
-    parser = argparse.ArgumentParser(prog="metrics-report")
-    subparsers = parser.add_subparsers(dest="command")
+def _classify_google_auth_error(exc: BaseException) -> bool:
+    try:
+        from google.auth.exceptions import DefaultCredentialsError, RefreshError
+    except Exception:  # pragma: no cover
+        return False
 
-    oauth_parser = subparsers.add_parser("oauth", help="OAuth helpers (local dev).")
-    oauth_subparsers = oauth_parser.add_subparsers(dest="oauth_command", required=True)
-    google_ads_oauth = oauth_subparsers.add_parser(
-        "google-ads",
-        help="Create a Google Ads OAuth refresh token from a client_secret json.",
-    )
-    google_ads_oauth.add_argument(
-        "--client-secret",
-        required=True,
-        help="Path to OAuth client_secret JSON downloaded from Google Cloud Console.",
-    )
-    google_ads_oauth.add_argument(
-        "--no-browser",
-        action="store_true",
-        help="Do not open the browser automatically (prints a URL instead).",
-    )
-    google_ads_oauth.add_argument(
-        "--port",
-        type=int,
-        default=8080,
-        help="Local callback port for OAuth redirect (default: 8080).",
-    )
-    google_ads_oauth.add_argument(
-        "--env-file",
-        default=".env",
-        help="Write GOOGLE_ADS_OAUTH_REFRESH_TOKEN to this env file (default: .env).",
-    )
-    google_ads_oauth.add_argument(
-        "--stdout",
-        action="store_true",
-        help="Print the refresh token to stdout (recommended for pasting into a secret manager).",
-    )
-    google_ads_oauth.add_argument(
-        "--force",
-        action="store_true",
-        help="Overwrite GOOGLE_ADS_OAUTH_REFRESH_TOKEN in the env file even if already set.",
+    if _find_in_exception_chain(exc, DefaultCredentialsError) is not None:
+        logging.error(
+            "No se encontraron credenciales de Google (ADC). "
+            "Solución: `gcloud auth application-default login` "
+            "o exportar `GOOGLE_APPLICATION_CREDENTIALS=/ruta/service-account.json`."
+        )
+        return True
+
+    if _find_in_exception_chain(exc, RefreshError) is not None:
+        logging.error(
+            "Reautenticación requerida para credenciales de Google. "
+            "Ejecuta: `gcloud auth application-default login "
+            "--scopes=https://www.googleapis.com/auth/cloud-platform,https://www.googleapis.com/auth/spreadsheets`."
+        )
+        return True
+
+    return False
+
+
+def _load_entry_point(spec: str) -> Callable[..., Any]:
+    module_name, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def _run_register_webhooks(args: argparse.Namespace) -> None:
+    from metrics_report.config import load_config
+    from metrics_report.webhook_register import register_webhooks
+
+    config = load_config(frozenset({"shopify"}))
+    register_webhooks(
+        shop_domain=config.shopify.shop_domain,
+        api_version=config.shopify.api_version,
+        access_token=config.shopify.access_token,
     )
 
-    subparsers.add_parser("register-webhooks", help="Register Shopify webhook subscriptions.")
+
+# Subcommands, resolved lazily: (help, "module:attr" parser config or None, "module:attr" handler).
+_COMMANDS: dict[str, tuple[str, str | None, str]] = {
+    "oauth": (
+        "OAuth helpers (local dev).",
+        "metrics_report.oauth:configure_parser",
+        "metrics_report.oauth:run_oauth_command",
+    ),
+    "register-webhooks": (
+        "Register Shopify webhook subscriptions.",
+        None,
+        "metrics_report.cli:_run_register_webhooks",
+    ),
+}
+
+
+def _requested_command(argv: list[str]) -> str | None:
+    for arg in argv:
+        if not arg.startswith("-"):
+            return arg if arg in _COMMANDS else None
+    return None
+
+
+def _wants_help(argv: list[str]) -> bool:
+    return any(arg == "-h" or arg.startswith("--h") for arg in argv)
+
+
+def _build_root_parser(command: str | None, *, with_subcommands: bool = True) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="metrics-report")
+    if with_subcommands:
+        subparsers = parser.add_subparsers(dest="command")
+        for name, (help_text, configure, _handler) in _COMMANDS.items():
+            subparser = subparsers.add_parser(name, help=help_text)
+            # Only the requested command pays for building its arguments.
+            if name == command and configure is not None:
+                _load_entry_point(configure)(subparser)
+    else:
+        parser.set_defaults(command=None)
 
     parser.add_argument(
         "--only",
         nargs="*",
-        choices=["shopify", "shopify_funnel", "customers", "meta", "meta_ads", "google_ads", "klaviyo"],
+        choices=_ONLY_CHOICES,
         default=None,
         help="Run only a subset of tasks.",
     )
@@ -211,52 +321,50 @@ def main(argv: list[str] | None = None) -> int:
         help="Only check Google Sheets access and exit.",
     )
     parser.add_argument("--dry-run", action="store_true", help="Do not append to Sheets.")
-    args = parser.parse_args(argv)
+    return parser
 
-    if load_dotenv is not None:
-        load_dotenv(override=False)
 
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
-    )
-
-    if args.command == "oauth":
-        from metrics_report.oauth import run_oauth_command
-
-        run_oauth_command(args)
-        return 0
-
-    if args.command == "register-webhooks":
-        from metrics_report.config import load_config
-        from metrics_report.webhook_register import register_webhooks
-
-        config = load_config()
-        register_webhooks(
-            shop_domain=config.shopify.shop_domain,
-            api_version=config.shopify.api_version,
-            access_token=config.shopify.access_token,
+def main(argv: list[str] | None = None) -> int:
+    raw_argv = sys.argv[1:] if argv is None else argv
+    command = _requested_command(raw_argv)
+    # Plain pipeline runs skip the subparsers action; `--help` still lists every command.
+    parser = _build_root_parser(command, with_subcommands=command is not None or _wants_help(raw_argv))
+    args = parser.parse_args(raw_argv)
+
+    # The oauth helpers report through print(); only the other branches log.
+    if args.command != "oauth":
+        logging.basicConfig(
+            level=logging.INFO,
+            format="%(asctime)s %(levelname)s %(name)s: %(message)s",
         )
+    # Always load .env: the oauth command reads its client id/secret from there too.
+    _bootstrap_env()
+
+    if args.command is not None:
+        _load_entry_point(_COMMANDS[args.command][2])(args)
         return 0
 
     from metrics_report.config import load_config
-    from metrics_report.pipeline import run_pipeline
 
-    config = load_config()
+    only = frozenset(args.only) if args.only else None
+    # --check-sheets only needs the spreadsheet ids, not any source credentials.
+    config = load_config(frozenset() if args.check_sheets else only)
     try:
         if args.check_sheets:
             from metrics_report.sheets import GoogleSheetsClient
 
             sheets = GoogleSheetsClient(config.sheets.spreadsheet_id)
-            for sheet_name in (
-                config.sheets.purchase_sheet,
-                config.sheets.meta_sheet,
-                config.sheets.ads_sheet,
-                config.sheets.gads_sheet,
-                config.sheets.klaviyo_sheet,
-                config.sheets.shopi_sheet,
-            ):
-                header = sheets.get_header(sheet_name)
+            headers = sheets.batch_get_headers(
+                [
+                    config.sheets.purchase_sheet,
+                    config.sheets.meta_sheet,
+                    config.sheets.ads_sheet,
+                    config.sheets.gads_sheet,
+                    config.sheets.klaviyo_sheet,
+                    config.sheets.shopi_sheet,
+                ]
+            )
+            for sheet_name, header in headers.items():
                 logging.info("Sheets OK: %s (%d columnas)", sheet_name, len(header))
 
             customers_sheets = GoogleSheetsClient(config.sheets.customers_spreadsheet_id)
@@ -269,34 +377,13 @@ def main(argv: list[str] | None = None) -> int:
             )
             return 0
 
-        run_pipeline(config, only=set(args.only) if args.only else None, dry_run=args.dry_run)
+        from metrics_report.pipeline import run_pipeline
+
+        run_pipeline(config, only=only, dry_run=args.dry_run)
     except Exception as exc:
         if _maybe_handle_google_sheets_http_error(exc):
             return 2
-        try:
-            from google.auth.exceptions import DefaultCredentialsError, RefreshError
-        except Exception:  # pragma: no cover
-            DefaultCredentialsError = None  # type: ignore[assignment]
-            RefreshError = None  # type: ignore[assignment]
-
-        if DefaultCredentialsError is not None:
-            for candidate in _iter_exception_chain(exc):
-                if isinstance(candidate, DefaultCredentialsError):
-                    logging.error(
-                        "No se encontraron credenciales de Google (ADC). "
-                        "Solución: `gcloud auth application-default login` "
-                        "o exportar `GOOGLE_APPLICATION_CREDENTIALS=/ruta/service-account.json`."
-                    )
-                    return 2
-
-        if RefreshError is not None:
-            for candidate in _iter_exception_chain(exc):
-                if isinstance(candidate, RefreshError):
-                    logging.error(
-                        "Reautenticación requerida para credenciales de Google. "
-                        "Ejecuta: `gcloud auth application-default login "
-                        "--scopes=https://www.googleapis.com/auth/cloud-platform,https://www.googleapis.com/auth/spreadsheets`."
-                    )
-                    return 2
+        if _classify_google_auth_error(exc):
+            return 2
         raise
     return 0
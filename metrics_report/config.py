@@ -1,21 +1,45 @@
 from __future__ import annotations
 
+import functools
 import os
 from dataclasses import dataclass
+from typing import Any, Callable, Iterable, overload
 
 
-_ENV_PREFIXES: tuple[str, ...] = ("LEJUSTE_", "")
+_ENV_PREFIX = "LEJUSTE_"
+_ENV_SNAPSHOT: dict[str, str] | None = None
+
+
+def _env_snapshot() -> dict[str, str]:
+    # One pass over os.environ; `LEJUSTE_`-prefixed keys win over bare names.
+    global _ENV_SNAPSHOT
+    if _ENV_SNAPSHOT is None:
+        snapshot: dict[str, str] = {}
+        prefixed: dict[str, str] = {}
+        for key, value in os.environ.items():
+            if key.startswith(_ENV_PREFIX):
+                prefixed[key[len(_ENV_PREFIX):]] = value.strip()
+            else:
+                snapshot[key] = value.strip()
+        snapshot.update(prefixed)
+        _ENV_SNAPSHOT = snapshot
+    return _ENV_SNAPSHOT
+
+
+@overload
+def _env(name: str, *, default: str) -> str: ...
+
+
+@overload
+def _env(name: str, *, default: None = None) -> str | None: ...
 
 
 def _env(name: str, *, default: str | None = None) -> str | None:
-    for prefix in _ENV_PREFIXES:
-        key = f"{prefix}{name}" if prefix else name
-        value = os.getenv(key)
-        if value is None:
-            continue
-        value = value.strip()
-        return value or default
-    return default
+    # Missing and blank variables both resolve to `default`.
+    value = _env_snapshot().get(name)
+    if value is None:
+        return default
+    return value or default
 
 
 def _required(name: str) -> str:
@@ -48,7 +72,7 @@ def _env_int(name: str, *, default: int) -> int:
         return default
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SheetsConfig:
     spreadsheet_id: str = "1h1_rGZEncDj8WRLnf4m9Kqr-78JGqoxq0CH_WnIzdH8"
     purchase_sheet: str = "PURCHASE"
@@ -61,7 +85,7 @@ class SheetsConfig:
     customers_sheet: str = "Consolidado"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ShopifyConfig:
     shop_domain: str = "le-juste-s.myshopify.com"
     api_version: str = "2024-10"
@@ -70,14 +94,14 @@ class ShopifyConfig:
     fixed_deduction_per_order: int = 0
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class MetaConfig:
     api_version: str = "v23.0"
     ad_account_id: str = "act_1219778112947622"
     access_token: str = ""
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class GoogleAdsConfig:
     api_version: str = "21"
     customer_id: str = "3261990482"
@@ -88,7 +112,7 @@ class GoogleAdsConfig:
     oauth_refresh_token: str = ""
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class KlaviyoConfig:
     revision: str = "2025-07-15"
     metric_id: str = "XvmGgm"
@@ -96,13 +120,13 @@ class KlaviyoConfig:
     private_key: str = ""
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class WebhookConfig:
     db_path: str = "/opt/metrics-report/webhooks.db"
     shopify_webhook_secret: str = ""
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class AppConfig:
     timezone: str = "America/Santiago"
     sheets: SheetsConfig = SheetsConfig()
@@ -113,82 +137,117 @@ class AppConfig:
     webhook: WebhookConfig = WebhookConfig()
 
 
-def load_config() -> AppConfig:
-    sheets = SheetsConfig(
-        spreadsheet_id=_env("GOOGLE_SHEETS_SPREADSHEET_ID", default=SheetsConfig.spreadsheet_id)
-        or SheetsConfig.spreadsheet_id,
-        purchase_sheet=_env("GOOGLE_SHEETS_PURCHASE_SHEET", default=SheetsConfig.purchase_sheet)
-        or SheetsConfig.purchase_sheet,
-        meta_sheet=_env("GOOGLE_SHEETS_META_SHEET", default=SheetsConfig.meta_sheet)
-        or SheetsConfig.meta_sheet,
-        gads_sheet=_env("GOOGLE_SHEETS_GADS_SHEET", default=SheetsConfig.gads_sheet) or SheetsConfig.gads_sheet,
-        klaviyo_sheet=_env("GOOGLE_SHEETS_KLAVIYO_SHEET", default=SheetsConfig.klaviyo_sheet)
-        or SheetsConfig.klaviyo_sheet,
-        ads_sheet=_env("GOOGLE_SHEETS_ADS_SHEET", default=SheetsConfig.ads_sheet)
-        or SheetsConfig.ads_sheet,
-        shopi_sheet=_env("GOOGLE_SHEETS_SHOPI_SHEET", default=SheetsConfig.shopi_sheet)
-        or SheetsConfig.shopi_sheet,
+_DEFAULTS = AppConfig()
+
+
+def _load_sheets() -> SheetsConfig:
+    defaults = _DEFAULTS.sheets
+    return SheetsConfig(
+        spreadsheet_id=_env("GOOGLE_SHEETS_SPREADSHEET_ID", default=defaults.spreadsheet_id),
+        purchase_sheet=_env("GOOGLE_SHEETS_PURCHASE_SHEET", default=defaults.purchase_sheet),
+        meta_sheet=_env("GOOGLE_SHEETS_META_SHEET", default=defaults.meta_sheet),
+        gads_sheet=_env("GOOGLE_SHEETS_GADS_SHEET", default=defaults.gads_sheet),
+        klaviyo_sheet=_env("GOOGLE_SHEETS_KLAVIYO_SHEET", default=defaults.klaviyo_sheet),
+        ads_sheet=_env("GOOGLE_SHEETS_ADS_SHEET", default=defaults.ads_sheet),
+        shopi_sheet=_env("GOOGLE_SHEETS_SHOPI_SHEET", default=defaults.shopi_sheet),
         customers_spreadsheet_id=_env(
             "GOOGLE_SHEETS_CUSTOMERS_SPREADSHEET_ID",
-            default=SheetsConfig.customers_spreadsheet_id,
-        )
-        or SheetsConfig.customers_spreadsheet_id,
-        customers_sheet=_env("GOOGLE_SHEETS_CUSTOMERS_SHEET", default=SheetsConfig.customers_sheet)
-        or SheetsConfig.customers_sheet,
+            default=defaults.customers_spreadsheet_id,
+        ),
+        customers_sheet=_env("GOOGLE_SHEETS_CUSTOMERS_SHEET", default=defaults.customers_sheet),
     )
 
-    shopify = ShopifyConfig(
-        shop_domain=_env("SHOPIFY_SHOP_DOMAIN", default=ShopifyConfig.shop_domain) or ShopifyConfig.shop_domain,
-        api_version=_env("SHOPIFY_API_VERSION", default=ShopifyConfig.api_version) or ShopifyConfig.api_version,
-        access_token=_env("SHOPIFY_ACCESS_TOKEN", default="") or "",
-        vat_factor=_env_float("SHOPIFY_VAT_FACTOR", default=ShopifyConfig.vat_factor),
+
+def _load_shopify() -> ShopifyConfig:
+    defaults = _DEFAULTS.shopify
+    return ShopifyConfig(
+        shop_domain=_env("SHOPIFY_SHOP_DOMAIN", default=defaults.shop_domain),
+        api_version=_env("SHOPIFY_API_VERSION", default=defaults.api_version),
+        access_token=_env("SHOPIFY_ACCESS_TOKEN", default=""),
+        vat_factor=_env_float("SHOPIFY_VAT_FACTOR", default=defaults.vat_factor),
         fixed_deduction_per_order=_env_int(
             "SHOPIFY_FIXED_DEDUCTION_PER_ORDER",
-            default=ShopifyConfig.fixed_deduction_per_order,
+            default=defaults.fixed_deduction_per_order,
         ),
     )
 
-    meta = MetaConfig(
-        api_version=_env("META_API_VERSION", default=MetaConfig.api_version) or MetaConfig.api_version,
-        ad_account_id=_env("META_AD_ACCOUNT_ID", default=MetaConfig.ad_account_id) or MetaConfig.ad_account_id,
-        access_token=_env("META_ACCESS_TOKEN", default="") or "",
+
+def _load_meta() -> MetaConfig:
+    defaults = _DEFAULTS.meta
+    return MetaConfig(
+        api_version=_env("META_API_VERSION", default=defaults.api_version),
+        ad_account_id=_env("META_AD_ACCOUNT_ID", default=defaults.ad_account_id),
+        access_token=_env("META_ACCESS_TOKEN", default=""),
     )
 
-    google_ads = GoogleAdsConfig(
-        api_version=_env("GOOGLE_ADS_API_VERSION", default=GoogleAdsConfig.api_version) or GoogleAdsConfig.api_version,
-        customer_id=_env("GOOGLE_ADS_CUSTOMER_ID", default=GoogleAdsConfig.customer_id)
-        or GoogleAdsConfig.customer_id,
-        login_customer_id=_env("GOOGLE_ADS_LOGIN_CUSTOMER_ID", default=GoogleAdsConfig.login_customer_id)
-        or GoogleAdsConfig.login_customer_id,
-        developer_token=_env("GOOGLE_ADS_DEVELOPER_TOKEN", default="") or "",
-        oauth_client_id=_env("GOOGLE_ADS_OAUTH_CLIENT_ID", default="") or "",
-        oauth_client_secret=_env("GOOGLE_ADS_OAUTH_CLIENT_SECRET", default="") or "",
-        oauth_refresh_token=_env("GOOGLE_ADS_OAUTH_REFRESH_TOKEN", default="") or "",
+
+def _load_google_ads() -> GoogleAdsConfig:
+    defaults = _DEFAULTS.google_ads
+    return GoogleAdsConfig(
+        api_version=_env("GOOGLE_ADS_API_VERSION", default=defaults.api_version),
+        customer_id=_env("GOOGLE_ADS_CUSTOMER_ID", default=defaults.customer_id),
+        login_customer_id=_env("GOOGLE_ADS_LOGIN_CUSTOMER_ID", default=defaults.login_customer_id),
+        developer_token=_env("GOOGLE_ADS_DEVELOPER_TOKEN", default=""),
+        oauth_client_id=_env("GOOGLE_ADS_OAUTH_CLIENT_ID", default=""),
+        oauth_client_secret=_env("GOOGLE_ADS_OAUTH_CLIENT_SECRET", default=""),
+        oauth_refresh_token=_env("GOOGLE_ADS_OAUTH_REFRESH_TOKEN", default=""),
     )
 
-    klaviyo = KlaviyoConfig(
-        revision=_env("KLAVIYO_REVISION", default=KlaviyoConfig.revision) or KlaviyoConfig.revision,
-        metric_id=_env("KLAVIYO_METRIC_ID", default=KlaviyoConfig.metric_id) or KlaviyoConfig.metric_id,
-        by=tuple(
-            cleaned
-            for raw in (_env("KLAVIYO_BY", default="") or "").split(",")
-            if (cleaned := raw.strip())
-        ),
-        private_key=_env("KLAVIYO_PRIVATE_KEY", default="") or "",
+
+def _load_klaviyo() -> KlaviyoConfig:
+    defaults = _DEFAULTS.klaviyo
+    raw_by = _env("KLAVIYO_BY", default="")
+    return KlaviyoConfig(
+        revision=_env("KLAVIYO_REVISION", default=defaults.revision),
+        metric_id=_env("KLAVIYO_METRIC_ID", default=defaults.metric_id),
+        by=tuple(part for part in (raw.strip() for raw in raw_by.split(",")) if part) if raw_by else (),
+        private_key=_env("KLAVIYO_PRIVATE_KEY", default=""),
     )
 
-    webhook = WebhookConfig(
-        db_path=_env("WEBHOOK_DB_PATH", default=WebhookConfig.db_path) or WebhookConfig.db_path,
-        shopify_webhook_secret=_env("SHOPIFY_WEBHOOK_SECRET", default="") or "",
+
+def _load_webhook() -> WebhookConfig:
+    defaults = _DEFAULTS.webhook
+    return WebhookConfig(
+        db_path=_env("WEBHOOK_DB_PATH", default=defaults.db_path),
+        shopify_webhook_secret=_env("SHOPIFY_WEBHOOK_SECRET", default=""),
     )
 
-    timezone = _env("REPORT_TIMEZONE", default=AppConfig.timezone) or AppConfig.timezone
+
+# Per-source builders, keyed by the AppConfig field they fill.
+_SOURCE_LOADERS: dict[str, Callable[[], object]] = {
+    "shopify": _load_shopify,
+    "meta": _load_meta,
+    "google_ads": _load_google_ads,
+    "klaviyo": _load_klaviyo,
+    "webhook": _load_webhook,
+}
+
+# Pipeline task -> sources it reads. `sheets` and `timezone` are always loaded.
+_TASK_SOURCES: dict[str, tuple[str, ...]] = {
+    "shopify": ("shopify",),
+    "shopify_funnel": ("shopify", "webhook"),
+    "customers": ("shopify",),
+    "meta": ("meta",),
+    "meta_ads": ("meta",),
+    "google_ads": ("google_ads",),
+    "klaviyo": ("klaviyo",),
+}
+
+
+@functools.lru_cache(maxsize=4)
+def load_config(only: frozenset[str] | None = None) -> AppConfig:
+    """Load config from the environment.
+
+    With `only` (pipeline task names), sources no task needs keep their defaults,
+    so their env vars are never read and their secrets stay out of memory.
+    """
+    if only is None:
+        sources: Iterable[str] = _SOURCE_LOADERS
+    else:
+        sources = {source for task in only for source in _TASK_SOURCES.get(task, ())}
+    loaded: dict[str, Any] = {source: _SOURCE_LOADERS[source]() for source in sources}
     return AppConfig(
-        timezone=timezone,
-        sheets=sheets,
-        shopify=shopify,
-        meta=meta,
-        google_ads=google_ads,
-        klaviyo=klaviyo,
-        webhook=webhook,
+        timezone=_env("REPORT_TIMEZONE", default=_DEFAULTS.timezone),
+        sheets=_load_sheets(),
+        **loaded,
     )
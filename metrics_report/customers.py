@@ -3,22 +3,25 @@ from __future__ import annotations
 import logging
 import re
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, Iterable
 
 from metrics_report.config import AppConfig
-from metrics_report.dates import add_days, datetime_to_ymd_in_tz, parse_iso_datetime, parse_ymd
-from metrics_report.sheets import GoogleSheetsClient, _coerce_cell_to_ymd, _col_letter
+from metrics_report.dates import add_days, iso_z_to_ymd_in_tz, parse_ymd
+from metrics_report.sheets import GoogleSheetsClient, _coerce_cell_to_ymd, _col_letter, _rows_to_matrix
 from metrics_report.shopify import (
-    _pick_money,
+    _pick_money_amount,
     _round_half_away_from_zero,
     build_shopify_search_query,
-    fetch_orders,
+    iter_orders,
 )
 
 
 _LOG = logging.getLogger(__name__)
+_INT_STRIP_RE = re.compile(r"[^0-9-]")
+_FLOAT_STRIP_RE = re.compile(r"[^0-9,.-]")
+_PLAIN_FLOAT_RE = re.compile(r"-?[0-9]+(?:\.[0-9]+)?")
 
-@dataclass
+@dataclass(slots=True)
 class CustomerAggregate:
     email: str
     name: str = ""
@@ -63,27 +66,33 @@ def _normalize_header(value: Any) -> str:
     return str(value or "").strip().lower()
 
 
+def _header_index(header: list[Any]) -> dict[str, int]:
+    # Normalized header -> first column with that name; blank cells are left out.
+    index: dict[str, int] = {}
+    for idx, raw in enumerate(header):
+        cell = _normalize_header(raw)
+        if cell:
+            index.setdefault(cell, idx)
+    return index
+
+
 def _find_header_idx(
-    header: list[Any],
+    header_index: dict[str, int],
     name: str,
     *,
     aliases: tuple[str, ...] = (),
     prefix: bool = False,
 ) -> int | None:
-    wanted = [_normalize_header(name), *(_normalize_header(a) for a in aliases)]
-    for idx, raw in enumerate(header):
-        cell = _normalize_header(raw)
-        if not cell:
-            continue
-        for w in wanted:
-            if not w:
-                continue
-            if cell == w or (prefix and cell.startswith(w)):
-                return idx
-    return None
+    wanted = [w for w in (_normalize_header(name), *(_normalize_header(a) for a in aliases)) if w]
+    found = [header_index[w] for w in wanted if w in header_index]
+    if prefix:
+        found.extend(idx for cell, idx in header_index.items() if cell.startswith(tuple(wanted)))
+    return min(found) if found else None
 
 
 def _coerce_int(value: Any) -> int | None:
+    if type(value) is int:  # exact type, so bools still fall through
+        return value
     if isinstance(value, bool) or value is None:
         return None
     if isinstance(value, int):
@@ -96,7 +105,9 @@ def _coerce_int(value: Any) -> int | None:
         s = value.strip()
         if not s:
             return None
-        digits = re.sub(r"[^0-9-]", "", s)
+        if s.isascii() and s.isdigit():
+            return int(s)
+        digits = _INT_STRIP_RE.sub("", s)
         if not digits or digits == "-":
             return None
         try:
@@ -107,6 +118,8 @@ def _coerce_int(value: Any) -> int | None:
 
 
 def _coerce_float(value: Any) -> float | None:
+    if type(value) is float:
+        return None if value != value else value  # NaN
     if isinstance(value, bool) or value is None:
         return None
     if isinstance(value, (int, float)):
@@ -118,8 +131,12 @@ def _coerce_float(value: Any) -> float | None:
         s = value.strip()
         if not s:
             return None
+        # Already-clean numbers skip the cleaning below; the match keeps "1e3", "nan"
+        # and friends on the old path so results don't change.
+        if _PLAIN_FLOAT_RE.fullmatch(s):
+            return float(s)
         # Remove currency symbols and keep digits/separators.
-        cleaned = re.sub(r"[^0-9,.-]", "", s)
+        cleaned = _FLOAT_STRIP_RE.sub("", s)
         if not cleaned or cleaned in {"-", ".", ","}:
             return None
         # Handle locales: if both '.' and ',' exist, assume ',' is thousands separator.
@@ -149,13 +166,17 @@ def _pick_discount_amount(order: dict[str, Any]) -> float:
 
 
 def _pick_customer_email(order: dict[str, Any]) -> str | None:
-    customer = order.get("customer") if isinstance(order.get("customer"), dict) else {}
+    customer = order.get("customer")
+    if not isinstance(customer, dict):
+        customer = {}
     email = customer.get("email") or order.get("email")
     return _normalize_email(email)
 
 
 def _pick_customer_name(order: dict[str, Any]) -> str:
-    customer = order.get("customer") if isinstance(order.get("customer"), dict) else {}
+    customer = order.get("customer")
+    if not isinstance(customer, dict):
+        customer = {}
     display = customer.get("displayName")
     if isinstance(display, str) and display.strip():
         return display.strip()
@@ -169,26 +190,43 @@ def _pick_customer_name(order: dict[str, Any]) -> str:
 
 
 def _pick_customer_phone(order: dict[str, Any]) -> str:
-    customer = order.get("customer") if isinstance(order.get("customer"), dict) else {}
+    customer = order.get("customer")
+    if not isinstance(customer, dict):
+        customer = {}
+    shipping = order.get("shippingAddress")
+    billing = order.get("billingAddress")
     for candidate in (
         customer.get("phone"),
         order.get("phone"),
-        (order.get("shippingAddress") or {}).get("phone") if isinstance(order.get("shippingAddress"), dict) else None,
-        (order.get("billingAddress") or {}).get("phone") if isinstance(order.get("billingAddress"), dict) else None,
+        shipping.get("phone") if isinstance(shipping, dict) else None,
+        billing.get("phone") if isinstance(billing, dict) else None,
     ):
         if isinstance(candidate, str) and candidate.strip():
             return candidate.strip()
     return ""
 
 
-def _ensure_consolidado_header(sheets: GoogleSheetsClient, sheet_name: str) -> tuple[list[str], bool]:
+def _sensitivity_label(*, discounted_orders: int, total_orders: int) -> str:
+    if total_orders <= 0:
+        return ""
+    ratio = discounted_orders / float(total_orders)
+    if ratio >= 0.8:
+        return "Alta"
+    if ratio >= 0.6:
+        return "Media"
+    return "Baja"
+
+
+def _ensure_consolidado_header(sheets: GoogleSheetsClient, sheet_name: str) -> tuple[list[str], bool, bool]:
+    # Returns (header, internal_missing, changed); the caller writes a changed header
+    # back in the same batchUpdate as the data.
     existing = sheets.get_header(sheet_name)
     if not existing:
         header = [*DEFAULT_CONSOLIDADO_HEADER, *INTERNAL_COLUMNS]
-        sheets.update_values(sheet_name, "A1", values=[header])
-        return header, True
+        return header, True, True
 
     header = list(existing)
+    header_index = _header_index(header)
     changed = False
 
     required = [
@@ -202,41 +240,41 @@ def _ensure_consolidado_header(sheets: GoogleSheetsClient, sheet_name: str) -> t
     ]
 
     for name, aliases, prefix in required:
-        if _find_header_idx(header, name, aliases=aliases, prefix=prefix) is None:
+        if _find_header_idx(header_index, name, aliases=aliases, prefix=prefix) is None:
             header.append(name)
+            header_index.setdefault(_normalize_header(name), len(header) - 1)
             changed = True
 
     internal_missing = False
     for name in INTERNAL_COLUMNS:
-        if _find_header_idx(header, name) is None:
+        if _find_header_idx(header_index, name) is None:
             header.append(name)
+            header_index.setdefault(_normalize_header(name), len(header) - 1)
             changed = True
             internal_missing = True
 
-    if changed:
-        sheets.update_values(sheet_name, "A1", values=[header])
-
-    return header, internal_missing
+    return header, internal_missing, changed
 
 
 def sync_consolidado_customers(config: AppConfig, *, end_ymd: str, dry_run: bool = False) -> None:
     consolidated = GoogleSheetsClient(config.sheets.customers_spreadsheet_id)
     sheet_name = config.sheets.customers_sheet
-    header, internal_added = _ensure_consolidado_header(consolidated, sheet_name)
+    header, internal_added, header_changed = _ensure_consolidado_header(consolidated, sheet_name)
+    header_index = _header_index(header)
 
-    email_idx = _find_header_idx(header, "Email")
+    email_idx = _find_header_idx(header_index, "Email")
     if email_idx is None:
         raise ValueError(f"Sheet '{sheet_name}' missing column 'Email'")
 
-    freq_idx = _find_header_idx(header, "Frecuency")
-    recency_idx = _find_header_idx(header, "Recency")
-    money_idx = _find_header_idx(header, "Money")
-    sensitivity_idx = _find_header_idx(header, SENSITIVITY_COLUMN, aliases=("Sensibilidad a descuento",), prefix=True)
+    freq_idx = _find_header_idx(header_index, "Frecuency")
+    recency_idx = _find_header_idx(header_index, "Recency")
+    money_idx = _find_header_idx(header_index, "Money")
+    sensitivity_idx = _find_header_idx(header_index, SENSITIVITY_COLUMN, aliases=("Sensibilidad a descuento",), prefix=True)
 
-    last_idx = _find_header_idx(header, "__last_purchase_ymd")
-    discounted_idx = _find_header_idx(header, "__discounted_orders")
-    total_idx = _find_header_idx(header, "__total_orders")
-    money_units_idx = _find_header_idx(header, "__money_units")
+    last_idx = _find_header_idx(header_index, "__last_purchase_ymd")
+    discounted_idx = _find_header_idx(header_index, "__discounted_orders")
+    total_idx = _find_header_idx(header_index, "__total_orders")
+    money_units_idx = _find_header_idx(header_index, "__money_units")
 
     missing_required = [
         name
@@ -263,7 +301,8 @@ def sync_consolidado_customers(config: AppConfig, *, end_ymd: str, dry_run: bool
         date_time_render_option="SERIAL_NUMBER",
     )
 
-    data_rows = max(0, len(values) - 1)
+    data_values = values[1:]
+    data_rows = len(data_values)
     row_emails: list[str | None] = []
     emails_in_sheet: set[str] = set()
     max_last: str | None = None
@@ -273,7 +312,7 @@ def sync_consolidado_customers(config: AppConfig, *, end_ymd: str, dry_run: bool
 
     aggregates: dict[str, CustomerAggregate] = {}
     if not internal_added:
-        for row in values[1:]:
+        for row in data_values:
             email = _normalize_email(cell(row, email_idx))
             row_emails.append(email)
             if not email:
@@ -300,7 +339,7 @@ def sync_consolidado_customers(config: AppConfig, *, end_ymd: str, dry_run: bool
             if last_ymd and (agg.last_purchase_ymd is None or last_ymd > agg.last_purchase_ymd):
                 agg.last_purchase_ymd = last_ymd
     else:
-        for row in values[1:]:
+        for row in data_values:
             email = _normalize_email(cell(row, email_idx))
             row_emails.append(email)
             if email:
@@ -316,7 +355,8 @@ def sync_consolidado_customers(config: AppConfig, *, end_ymd: str, dry_run: bool
         if max_last_date:
             start_ymd = add_days(max_last_date, 1).isoformat()
 
-    orders: list[dict[str, Any]] = []
+    # Orders are folded into the aggregates page by page as they arrive.
+    orders: Iterable[dict[str, Any]] = ()
     if start_ymd and start_ymd > end_ymd:
         _LOG.info("Customers: nothing to fetch (start=%s end=%s)", start_ymd, end_ymd)
     else:
@@ -325,7 +365,7 @@ def sync_consolidado_customers(config: AppConfig, *, end_ymd: str, dry_run: bool
         else:
             query = " ".join([f"created_at:<={end_ymd}", "financial_status:paid", "-status:cancelled"])
 
-        orders = fetch_orders(
+        orders = iter_orders(
             shop_domain=config.shopify.shop_domain,
             api_version=config.shopify.api_version,
             access_token=config.shopify.access_token,
@@ -341,8 +381,8 @@ def sync_consolidado_customers(config: AppConfig, *, end_ymd: str, dry_run: bool
         if not isinstance(created_at, str) or not created_at:
             continue
 
-        day = datetime_to_ymd_in_tz(parse_iso_datetime(created_at), config.timezone)
-        amount, _currency = _pick_money(order)
+        day = iso_z_to_ymd_in_tz(created_at, config.timezone)
+        amount = _pick_money_amount(order)
         discount_amount = _pick_discount_amount(order)
         net_units = (amount - float(config.shopify.fixed_deduction_per_order)) / float(config.shopify.vat_factor)
 
@@ -358,38 +398,36 @@ def sync_consolidado_customers(config: AppConfig, *, end_ymd: str, dry_run: bool
         if agg.last_purchase_ymd is None or day > agg.last_purchase_ymd:
             agg.last_purchase_ymd = day
 
-        if not agg.name:
-            agg.name = _pick_customer_name(order)
-        if not agg.phone:
-            agg.phone = _pick_customer_phone(order)
+        # Name/phone are only written for customers appended below.
+        if email not in emails_in_sheet:
+            if not agg.name:
+                agg.name = _pick_customer_name(order)
+            if not agg.phone:
+                agg.phone = _pick_customer_phone(order)
 
     end_date = parse_ymd(end_ymd)
     if not end_date:
         raise ValueError(f"Invalid end_ymd: {end_ymd!r}")
 
-    def sensitivity_label(*, discounted_orders: int, total_orders: int) -> str:
-        if total_orders <= 0:
-            return ""
-        ratio = discounted_orders / float(total_orders)
-        if ratio >= 0.8:
-            return "Alta"
-        if ratio >= 0.6:
-            return "Media"
-        return "Baja"
-
+    # Many customers share a last-purchase day: parse each distinct day once.
+    recency_by_ymd: dict[str, int | None] = {}
     updates_by_email: dict[str, dict[int, Any]] = {}
     for email, agg in aggregates.items():
         if not agg.last_purchase_ymd:
             continue
-        last_date = parse_ymd(agg.last_purchase_ymd)
-        if not last_date:
+        try:
+            recency_days = recency_by_ymd[agg.last_purchase_ymd]
+        except KeyError:
+            last_date = parse_ymd(agg.last_purchase_ymd)
+            recency_days = (end_date - last_date).days if last_date else None
+            recency_by_ymd[agg.last_purchase_ymd] = recency_days
+        if recency_days is None:
             continue
-        recency_days = (end_date - last_date).days
         updates_by_email[email] = {
             freq_idx: int(agg.total_orders),
-            recency_idx: int(recency_days),
+            recency_idx: recency_days,
             money_idx: _round_half_away_from_zero(float(agg.money_units)),
-            sensitivity_idx: sensitivity_label(
+            sensitivity_idx: _sensitivity_label(
                 discounted_orders=int(agg.discounted_orders),
                 total_orders=int(agg.total_orders),
             ),
@@ -410,8 +448,12 @@ def sync_consolidado_customers(config: AppConfig, *, end_ymd: str, dry_run: bool
         )
         return
 
+    batch_updates: list[tuple[str, list[list[Any]]]] = []
+    if header_changed:
+        batch_updates.append(("A1", [header]))
+
     if data_rows:
-        update_cols = sorted({*updates_by_email[next(iter(updates_by_email))].keys()} if updates_by_email else set())
+        update_cols = sorted(updates_by_email[next(iter(updates_by_email))]) if updates_by_email else []
         groups: list[list[int]] = []
         for idx in update_cols:
             if not groups or idx != groups[-1][-1] + 1:
@@ -419,38 +461,35 @@ def sync_consolidado_customers(config: AppConfig, *, end_ymd: str, dry_run: bool
             else:
                 groups[-1].append(idx)
 
-        batch_updates: list[tuple[str, list[list[Any]]]] = []
-        for group in groups:
-            start_col = _col_letter(group[0])
-            end_col = _col_letter(group[-1])
-            a1_range = (
-                f"{start_col}2:{end_col}{data_rows + 1}"
-                if start_col != end_col
-                else f"{start_col}2:{start_col}{data_rows + 1}"
-            )
-            matrix: list[list[Any]] = []
-            for row_idx in range(data_rows):
-                row = values[row_idx + 1] if row_idx + 1 < len(values) else []
-                email = row_emails[row_idx] if row_idx < len(row_emails) else None
-                row_updates = updates_by_email.get(email or "")
-                out_row: list[Any] = []
-                for col_idx in group:
-                    if row_updates and col_idx in row_updates:
-                        out_row.append(row_updates[col_idx])
-                    else:
-                        out_row.append(cell(row, col_idx))
-                matrix.append(out_row)
-            batch_updates.append((a1_range, matrix))
-
-        if batch_updates:
-            consolidated.batch_update_values(sheet_name, updates=batch_updates)
+        if groups:
+            # Apply the updates once over the [lo, hi] column span, then slice each group out of it.
+            lo, hi = groups[0][0], groups[-1][-1]
+            width = hi - lo + 1
+            updatable = updates_by_email.keys() & emails_in_sheet
+            merged: list[list[Any]] = []
+            for row, email in zip(data_values, row_emails):
+                span = row[lo : hi + 1]
+                if len(span) < width:
+                    span.extend([""] * (width - len(span)))
+                if email in updatable:
+                    for col_idx, value in updates_by_email[email].items():
+                        span[col_idx - lo] = value
+                merged.append(span)
+
+            for group in groups:
+                first, last = group[0] - lo, group[-1] - lo + 1
+                batch_updates.append(
+                    (
+                        f"{_col_letter(group[0])}2:{_col_letter(group[-1])}{data_rows + 1}",
+                        [span[first:last] for span in merged],
+                    )
+                )
 
     new_rows: list[dict[str, Any]] = []
-    name_idx = _find_header_idx(header, "Nombre")
-    phone_idx = _find_header_idx(header, "Teléfono", aliases=("Telefono",))
-    for email, updates in sorted(updates_by_email.items(), key=lambda kv: kv[0]):
-        if email in emails_in_sheet:
-            continue
+    name_idx = _find_header_idx(header_index, "Nombre")
+    phone_idx = _find_header_idx(header_index, "Teléfono", aliases=("Telefono",))
+    for email in sorted(updates_by_email.keys() - emails_in_sheet):
+        updates = updates_by_email[email]
         agg = aggregates.get(email)
         if agg is None:
             continue
@@ -471,7 +510,18 @@ def sync_consolidado_customers(config: AppConfig, *, end_ymd: str, dry_run: bool
         new_rows.append(row)
 
     if new_rows:
-        consolidated.append_rows(sheet_name, header=header, rows=new_rows)
+        # New customers go right below the last data row, in the same batchUpdate,
+        # instead of a separate values.append round trip.
+        first_new = data_rows + 2
+        batch_updates.append(
+            (
+                f"A{first_new}:{last_letter}{first_new + len(new_rows) - 1}",
+                _rows_to_matrix(sheet_name, header=header, rows=new_rows),
+            )
+        )
+
+    if batch_updates:
+        consolidated.batch_update_values(sheet_name, updates=batch_updates)
 
     _LOG.info(
         "Customers: updated %d existing row(s), appended %d new customer(s) to %s",
@@ -1,19 +1,25 @@
 from __future__ import annotations
 
-import re
+import functools
 from datetime import date, datetime, timedelta
 from zoneinfo import ZoneInfo
 
-_YMD_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_UTC = ZoneInfo("UTC")
+
+
+@functools.lru_cache(maxsize=32)
+def _tz(name: str) -> ZoneInfo:
+    return ZoneInfo(name)
 
 
 def parse_ymd(value: str | None) -> date | None:
-    if not value:
+    # fromisoformat() also takes "20250101" and "2025-W01-1"; only YYYY-MM-DD gets through.
+    if not value or len(value) != 10 or value[4] != "-" or value[7] != "-":
         return None
-    if not _YMD_RE.match(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
         return None
-    year, month, day = map(int, value.split("-"))
-    return date(year, month, day)
 
 
 def format_ymd(value: date) -> str:
@@ -25,8 +31,7 @@ def add_days(value: date, days: int) -> date:
 
 
 def today_in_tz(timezone: str) -> date:
-    tz = ZoneInfo(timezone)
-    return datetime.now(tz=tz).date()
+    return datetime.now(tz=_tz(timezone)).date()
 
 
 def yesterday_ymd(timezone: str) -> str:
@@ -40,10 +45,21 @@ def parse_iso_datetime(value: str) -> datetime:
 
 
 def datetime_to_ymd_in_tz(value: datetime, timezone: str) -> str:
-    tz = ZoneInfo(timezone)
     if value.tzinfo is None:
-        value = value.replace(tzinfo=ZoneInfo("UTC"))
-    return value.astimezone(tz).date().isoformat()
+        value = value.replace(tzinfo=_UTC)
+    return value.astimezone(_tz(timezone)).date().isoformat()
+
+
+def iso_z_to_ymd_in_tz(value: str, timezone: str) -> str:
+    # Fast path for the "YYYY-MM-DDTHH:MM:SSZ" timestamps Shopify returns.
+    if len(value) == 20 and value[-1] == "Z" and value[10] == "T":
+        try:
+            utc = datetime.fromisoformat(value[:19]).replace(tzinfo=_UTC)
+        except ValueError:
+            pass
+        else:
+            return utc.astimezone(_tz(timezone)).date().isoformat()
+    return datetime_to_ymd_in_tz(parse_iso_datetime(value), timezone)
 
 
 def daterange_inclusive(start: date, end: date) -> list[date]:
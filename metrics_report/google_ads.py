@@ -2,7 +2,6 @@ from __future__ import annotations
 
 import logging
 import os
-from collections import defaultdict
 from pathlib import Path
 from typing import Any
 
@@ -130,7 +129,9 @@ def search(
     access_token: str,
     gaql: str,
 ) -> list[dict[str, Any]]:
-    url = f"https://googleads.googleapis.com/v{api_version}/customers/{customer_id}/googleAds:search"
+    # searchStream returns every row in one response (a JSON array of result batches),
+    # so there is no nextPageToken round-trip chain to serialize on.
+    url = f"https://googleads.googleapis.com/v{api_version}/customers/{customer_id}/googleAds:searchStream"
     headers = {
         "Authorization": f"Bearer {access_token}",
         "developer-token": developer_token,
@@ -138,64 +139,67 @@ def search(
         "Content-Type": "application/json",
     }
 
+    resp: Any = request_json("POST", url, headers=headers, json_body={"query": gaql})
+    batches = resp if isinstance(resp, list) else [resp]
     results: list[dict[str, Any]] = []
-    page_token: str | None = None
-    while True:
-        body: dict[str, Any] = {"query": gaql}
-        if page_token:
-            body["pageToken"] = page_token
-        resp = request_json("POST", url, headers=headers, json_body=body)
-        results.extend(resp.get("results") or [])
-        page_token = resp.get("nextPageToken")
-        if not page_token:
-            break
+    for batch in batches:
+        if isinstance(batch, dict):
+            results.extend(batch.get("results") or [])
 
     _LOG.info("Google Ads returned %d rows", len(results))
     return results
 
 
+def _to_int(v: Any) -> int:
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        try:
+            return int(float(v))
+        except (TypeError, ValueError):
+            return 0
+
+
+def _to_float(v: Any) -> float:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return 0.0
+
+
 def results_to_sheet_rows(items: list[dict[str, Any]]) -> list[dict[str, Any]]:
-    by_date: dict[str, dict[str, float]] = defaultdict(
-        lambda: {"impressions": 0.0, "clicks": 0.0, "cost_units": 0.0}
-    )
+    # One lookup per item into date -> slot; the three metrics live in parallel lists.
+    date_to_idx: dict[str, int] = {}
+    impressions: list[int] = []
+    clicks: list[int] = []
+    cost_micros: list[float] = []
     for it in items:
         if not isinstance(it, dict):
             continue
-        segments = it.get("segments") if isinstance(it.get("segments"), dict) else {}
-        metrics = it.get("metrics") if isinstance(it.get("metrics"), dict) else {}
-        date = segments.get("date")
+        segments = it.get("segments")
+        date = segments.get("date") if isinstance(segments, dict) else None
         if not isinstance(date, str) or not date:
             continue
-
-        def to_int(v: Any) -> int:
-            try:
-                return int(v)
-            except (TypeError, ValueError):
-                try:
-                    return int(float(v))
-                except (TypeError, ValueError):
-                    return 0
-
-        def micros_to_units(v: Any) -> float:
-            try:
-                return float(v) / 1_000_000
-            except (TypeError, ValueError):
-                return 0.0
-
-        acc = by_date[date]
-        acc["impressions"] += float(to_int(metrics.get("impressions")))
-        acc["clicks"] += float(to_int(metrics.get("clicks")))
-        acc["cost_units"] += micros_to_units(metrics.get("costMicros"))
-
-    rows: list[dict[str, Any]] = []
-    for date in sorted(by_date.keys()):
-        acc = by_date[date]
-        rows.append(
-            {
-                "Fecha": date,
-                "Impresiones": int(acc["impressions"]),
-                "Visitas": int(acc["clicks"]),
-                "Inversión - CLP": acc["cost_units"],
-            }
-        )
-    return rows
+        metrics = it.get("metrics")
+        if not isinstance(metrics, dict):
+            metrics = {}
+
+        i = date_to_idx.get(date)
+        if i is None:
+            i = date_to_idx[date] = len(impressions)
+            impressions.append(0)
+            clicks.append(0)
+            cost_micros.append(0.0)
+        impressions[i] += _to_int(metrics.get("impressions"))
+        clicks[i] += _to_int(metrics.get("clicks"))
+        cost_micros[i] += _to_float(metrics.get("costMicros"))
+
+    return [
+        {
+            "Fecha": date,
+            "Impresiones": impressions[i],
+            "Visitas": clicks[i],
+            "Inversión - CLP": cost_micros[i] / 1_000_000,
+        }
+        for date, i in sorted(date_to_idx.items())
+    ]
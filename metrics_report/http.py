@@ -1,16 +1,74 @@
 from __future__ import annotations
 
 import json
+import random
 import time
 from typing import Any
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ModuleNotFoundError:  # pragma: no cover
+    orjson = None
+
+
+_CONNECT_TIMEOUT_S = 5
+_MAX_RETRY_AFTER_S = 60.0
+
+
+def _build_session() -> requests.Session:
+    # Shared so every source reuses its TCP/TLS connections. The pool is sized for the
+    # concurrent pipeline tasks and Meta shards. Only connection failures are retried
+    # here (nothing was sent yet); status retries stay in request_json, which honors
+    # Retry-After.
+    adapter = HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=32,
+        max_retries=Retry(total=3, connect=3, read=0, status=0, other=0, backoff_factor=0.3),
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_SESSION = _build_session()
 
 
 class HttpError(RuntimeError):
     pass
 
 
+def loads(content: bytes | str) -> Any:
+    # Decode the raw body directly; orjson.JSONDecodeError subclasses json.JSONDecodeError.
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def dumps(value: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(value).decode()
+    return json.dumps(value, separators=(",", ":"))
+
+
+def _retry_delay(resp: requests.Response, attempt: int) -> float | None:
+    # Honor a numeric Retry-After (seconds); HTTP-date values fall back to backoff.
+    # None when the server asks for longer than a pipeline worker should block.
+    retry_after = resp.headers.get("Retry-After")
+    if retry_after:
+        try:
+            delay = max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        else:
+            return delay if delay <= _MAX_RETRY_AFTER_S else None
+    return (2**attempt) * (1 + random.random() * 0.1)
+
+
 def request_json(
     method: str,
     url: str,
@@ -23,25 +81,33 @@ def request_json(
 ) -> dict[str, Any]:
     retry_statuses = {429, 500, 502, 503, 504}
     last_error: Exception | None = None
+    # Encode the body once (not once per retry) with the same shim used for decoding.
+    data: bytes | None = None
+    if json_body is not None:
+        data = dumps(json_body).encode("utf-8")
+        if not any(k.lower() == "content-type" for k in (headers or {})):
+            headers = {**(headers or {}), "Content-Type": "application/json"}
     for attempt in range(max_retries):
-        resp = requests.request(
+        resp = _SESSION.request(
             method=method,
             url=url,
             headers=headers,
             params=params,
-            json=json_body,
-            timeout=timeout_s,
+            data=data,
+            timeout=(_CONNECT_TIMEOUT_S, timeout_s),
         )
         if resp.status_code in retry_statuses and attempt < max_retries - 1:
-            time.sleep(2**attempt)
-            continue
+            delay = _retry_delay(resp, attempt)
+            if delay is not None:
+                time.sleep(delay)
+                continue
         try:
             resp.raise_for_status()
         except requests.HTTPError as e:
             msg = f"{method} {url} failed: {resp.status_code} {resp.text[:2000]}"
             raise HttpError(msg) from e
         try:
-            return resp.json()
+            return loads(resp.content)
         except json.JSONDecodeError as e:
             last_error = e
             break
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import logging
-from collections import defaultdict
 from typing import Any
 
 from metrics_report.http import request_json
@@ -59,11 +58,9 @@ def metric_aggregates_to_sheet_rows(resp: dict[str, Any]) -> list[dict[str, Any]
         _LOG.info("Klaviyo response missing dates")
         return []
 
-    totals_by_date: dict[str, int] = defaultdict(int)
-
-    for d in dates:
-        if isinstance(d, str) and len(d) >= 10:
-            totals_by_date[d[:10]] += 0
+    # Validate the dates once; every series is then summed over the same (index, day) pairs.
+    day_slots = [(i, d[:10]) for i, d in enumerate(dates) if isinstance(d, str) and len(d) >= 10]
+    totals_by_date: dict[str, int] = dict.fromkeys((day for _i, day in day_slots), 0)
 
     if not isinstance(data, list):
         _LOG.info("Klaviyo response missing data")
@@ -82,18 +79,13 @@ def metric_aggregates_to_sheet_rows(resp: dict[str, Any]) -> list[dict[str, Any]
         if counts is None:
             continue
 
-        for i, d in enumerate(dates):
-            if not isinstance(d, str) or len(d) < 10:
-                continue
-            date = d[:10]
-            count = counts[i] if i < len(counts) else 0
+        n_counts = len(counts)
+        for i, date in day_slots:
+            if i >= n_counts:
+                break
             try:
-                count_int = int(count)
+                totals_by_date[date] += int(counts[i])
             except (TypeError, ValueError):
-                count_int = 0
-            totals_by_date[date] += count_int
+                pass
 
-    rows: list[dict[str, Any]] = []
-    for date in sorted(totals_by_date.keys()):
-        rows.append({"Fecha": date, "Suscriptores": totals_by_date[date]})
-    return rows
+    return [{"Fecha": date, "Suscriptores": total} for date, total in sorted(totals_by_date.items())]
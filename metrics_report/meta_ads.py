@@ -1,14 +1,77 @@
 from __future__ import annotations
 
-import json
 import logging
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
 from typing import Any
 
-from metrics_report.http import request_json
+from metrics_report.dates import add_days, parse_ymd
+from metrics_report.http import dumps, request_json
 
 
 _LOG = logging.getLogger(__name__)
+# Meta rate-limits per app and the account and ad tasks run side by side, so a long
+# range is split into at most this many shards: four Graph calls in flight at most.
+_MAX_RANGE_SHARDS = 2
+_MIN_SHARD_DAYS = 7
+
+
+def _time_range(since_ymd: str, until_ymd: str) -> str:
+    return dumps({"since": since_ymd, "until": until_ymd})
+
+
+def _split_range(since_ymd: str, until_ymd: str) -> list[tuple[str, str]]:
+    since = parse_ymd(since_ymd)
+    until = parse_ymd(until_ymd)
+    if not since or not until or until < since:
+        return [(since_ymd, until_ymd)]
+    days = (until - since).days + 1
+    shard_days = max(_MIN_SHARD_DAYS, -(-days // _MAX_RANGE_SHARDS))
+    shards: list[tuple[str, str]] = []
+    cur = since
+    while cur <= until:
+        end = min(until, add_days(cur, shard_days - 1))
+        shards.append((cur.isoformat(), end.isoformat()))
+        cur = add_days(end, 1)
+    return shards
+
+
+def _fetch_pages(url: str, params: dict[str, str], *, error_label: str) -> list[dict[str, Any]]:
+    out: list[dict[str, Any]] = []
+    while True:
+        resp = request_json("GET", url, params=params)
+        if "error" in resp:
+            raise RuntimeError(f"{error_label}: {resp['error']}")
+        out.extend(resp.get("data") or [])
+        paging = resp.get("paging")
+        next_url = paging.get("next") if isinstance(paging, dict) else None
+        if not next_url:
+            break
+        url = next_url
+        params = {}
+    return out
+
+
+def _fetch_sharded(
+    url: str,
+    params: dict[str, str],
+    *,
+    since_ymd: str,
+    until_ymd: str,
+    error_label: str,
+) -> list[dict[str, Any]]:
+    # Meta cursors are opaque, so pages can't be fetched ahead. Instead the date range is
+    # split into contiguous shards that each drain their own paging chain concurrently.
+    shards = _split_range(since_ymd, until_ymd)
+
+    def fetch(shard: tuple[str, str]) -> list[dict[str, Any]]:
+        return _fetch_pages(url, {**params, "time_range": _time_range(*shard)}, error_label=error_label)
+
+    if len(shards) == 1:
+        return fetch(shards[0])
+    with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+        # map() keeps shard order, so rows stay in date order.
+        return [item for items in pool.map(fetch, shards) for item in items]
 
 
 def fetch_account_insights_by_day(
@@ -20,73 +83,79 @@ def fetch_account_insights_by_day(
     until_ymd: str,
 ) -> list[dict[str, Any]]:
     url = f"https://graph.facebook.com/{api_version}/{ad_account_id}/insights"
-    params = {
+    params: dict[str, str] = {
         "fields": "spend,impressions,reach,inline_link_clicks",
         "level": "account",
-        "time_range": json.dumps({"since": since_ymd, "until": until_ymd}),
         "time_increment": "1",
         "limit": "5000",
         "access_token": access_token,
     }
 
-    out: list[dict[str, Any]] = []
-    while True:
-        resp = request_json("GET", url, params={k: str(v) for k, v in params.items()})
-        if "error" in resp:
-            raise RuntimeError(f"Meta API error: {resp['error']}")
-        out.extend(resp.get("data") or [])
-        next_url = ((resp.get("paging") or {}).get("next")) if isinstance(resp.get("paging"), dict) else None
-        if not next_url:
-            break
-        url = next_url
-        params = {}
+    out = _fetch_sharded(url, params, since_ymd=since_ymd, until_ymd=until_ymd, error_label="Meta API error")
 
     _LOG.info("Meta returned %d rows", len(out))
     return out
 
 
-def insights_to_sheet_rows(items: list[dict[str, Any]]) -> list[dict[str, Any]]:
-    by_date: dict[str, dict[str, float]] = defaultdict(
-        lambda: {"spend": 0.0, "impressions": 0.0, "reach": 0.0, "clicks": 0.0}
-    )
+def _to_int(v: Any) -> int:
+    # Meta sends counts as digit strings; those skip the float() detour.
+    if type(v) is int:
+        return v
+    if type(v) is str and v.isascii() and v.isdigit():
+        return int(v)
+    try:
+        return int(float(v))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _to_float(v: Any) -> float:
+    if type(v) is float:
+        return v
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def insights_to_sheet_rows(items: list[dict[str, Any]], *, since_cutoff: str | None = None) -> list[dict[str, Any]]:
+    # date -> slot into four parallel metric lists.
+    date_to_idx: dict[str, int] = {}
+    spend: list[float] = []
+    impressions: list[int] = []
+    reach: list[int] = []
+    clicks: list[int] = []
     for it in items:
         if not isinstance(it, dict):
             continue
         date = it.get("date_start")
         if not isinstance(date, str) or not date:
             continue
+        if since_cutoff and date <= since_cutoff:
+            continue
 
-        def to_int(v: Any) -> int:
-            try:
-                return int(float(v))
-            except (TypeError, ValueError):
-                return 0
-
-        def to_float(v: Any) -> float:
-            try:
-                return float(v)
-            except (TypeError, ValueError):
-                return 0.0
-
-        acc = by_date[date]
-        acc["spend"] += to_float(it.get("spend"))
-        acc["impressions"] += float(to_int(it.get("impressions")))
-        acc["reach"] += float(to_int(it.get("reach")))
-        acc["clicks"] += float(to_int(it.get("inline_link_clicks")))
-
-    rows: list[dict[str, Any]] = []
-    for date in sorted(by_date.keys()):
-        acc = by_date[date]
-        rows.append(
-            {
-                "Fecha": date,
-                "Inversión - CLP": acc["spend"],
-                "Impresiones": int(acc["impressions"]),
-                "Alcance": int(acc["reach"]),
-                "Visitas": int(acc["clicks"]),
-            }
-        )
-    return rows
+        idx = date_to_idx.get(date)
+        if idx is None:
+            idx = date_to_idx[date] = len(spend)
+            spend.append(0.0)
+            impressions.append(0)
+            reach.append(0)
+            clicks.append(0)
+        spend[idx] += _to_float(it.get("spend"))
+        impressions[idx] += _to_int(it.get("impressions"))
+        reach[idx] += _to_int(it.get("reach"))
+        clicks[idx] += _to_int(it.get("inline_link_clicks"))
+
+    return [
+        {
+            "Fecha": date,
+            "Inversión - CLP": spend[idx],
+            "Impresiones": impressions[idx],
+            "Alcance": reach[idx],
+            "Visitas": clicks[idx],
+        }
+        for date, idx in sorted(date_to_idx.items())
+    ]
 
 
 # ---------------------------------------------------------------------------
@@ -112,60 +181,48 @@ def fetch_ad_insights_by_day(
             "video_avg_time_watched_actions",
         ]),
         "level": "ad",
-        "time_range": json.dumps({"since": since_ymd, "until": until_ymd}),
         "time_increment": "1",
         "limit": "5000",
         "access_token": access_token,
     }
 
-    out: list[dict[str, Any]] = []
-    while True:
-        resp = request_json("GET", url, params=params)
-        if "error" in resp:
-            raise RuntimeError(f"Meta Ads API error: {resp['error']}")
-        out.extend(resp.get("data") or [])
-        next_url = (
-            (resp.get("paging") or {}).get("next")
-            if isinstance(resp.get("paging"), dict)
-            else None
-        )
-        if not next_url:
-            break
-        url = next_url
-        params = {}
+    out = _fetch_sharded(url, params, since_ymd=since_ymd, until_ymd=until_ymd, error_label="Meta Ads API error")
 
     _LOG.info("Meta Ads (ad-level) returned %d rows", len(out))
     return out
 
 
-def _extract_action(actions: list[dict[str, Any]] | None, *type_names: str) -> int:
-    """Return the integer value for the first matching action_type."""
-    if not actions:
-        return 0
-    for a in actions:
-        if a.get("action_type") in type_names:
-            try:
-                return int(float(a.get("value", 0)))
-            except (TypeError, ValueError):
-                pass
-    return 0
+def _index_actions(actions: list[Any]) -> dict[str, tuple[int, int]]:
+    """Map each action_type to (position, value) of its first parseable entry."""
+    index: dict[str, tuple[int, int]] = {}
+    for pos, a in enumerate(actions):
+        if not isinstance(a, dict):
+            continue
+        action_type = a.get("action_type")
+        if action_type in index:
+            continue
+        try:
+            index[action_type] = (pos, int(float(a.get("value", 0))))
+        except (TypeError, ValueError):
+            pass
+    return index
 
 
-def ad_insights_to_sheet_rows(items: list[dict[str, Any]]) -> list[dict[str, Any]]:
-    """Convert ad-level insight rows into sheet-ready dicts."""
+def _pick_action(index: dict[str, tuple[int, int]], *type_names: str) -> int:
+    """Return the value of whichever of type_names appears first in the actions list."""
+    found = [index[t] for t in type_names if t in index]
+    return min(found)[1] if found else 0
 
-    def _int(v: Any) -> int:
-        try:
-            return int(float(v))
-        except (TypeError, ValueError):
-            return 0
 
-    def _float(v: Any) -> float:
-        try:
-            return float(v)
-        except (TypeError, ValueError):
-            return 0.0
+_AD_ROW_SORT_KEY = itemgetter("Fecha", "Campaña", "Adset", "Ad")
 
+
+def ad_insights_to_sheet_rows(
+    items: list[dict[str, Any]],
+    *,
+    since_cutoff: str | None = None,
+) -> list[dict[str, Any]]:
+    """Convert ad-level insight rows into sheet-ready dicts, skipping dates <= since_cutoff."""
     rows: list[dict[str, Any]] = []
     for it in items:
         if not isinstance(it, dict):
@@ -173,33 +230,37 @@ def ad_insights_to_sheet_rows(items: list[dict[str, Any]]) -> list[dict[str, Any
         date = it.get("date_start")
         if not isinstance(date, str) or not date:
             continue
+        if since_cutoff and date <= since_cutoff:
+            continue
 
-        spend = _float(it.get("spend"))
+        # Zero-spend rows are dropped before any of the nested action lists are touched.
+        spend = _to_float(it.get("spend"))
         if spend == 0.0:
             continue
 
-        actions = it.get("actions") if isinstance(it.get("actions"), list) else []
-        impressions = _int(it.get("impressions"))
+        actions = it.get("actions")
+        action_index = _index_actions(actions) if actions and type(actions) is list else {}
+        impressions = _to_int(it.get("impressions"))
 
         # 3-second video views → Hook Rate numerator
-        video_views_3s = _extract_action(actions, "video_view")
+        video_views_3s = _pick_action(action_index, "video_view")
 
         # ThruPlay → Hold Rate numerator
         thruplay_raw = it.get("video_thruplay_watched_actions")
         thruplay = 0
-        if isinstance(thruplay_raw, list) and thruplay_raw:
+        if thruplay_raw and type(thruplay_raw) is list:
             try:
-                thruplay = int(float(thruplay_raw[0].get("value", 0)))
-            except (TypeError, ValueError, IndexError):
+                thruplay = int(float(thruplay_raw[0]["value"]))
+            except (KeyError, TypeError, ValueError):
                 pass
 
         # Average video watch time (seconds)
         avg_time_raw = it.get("video_avg_time_watched_actions")
         avg_time = 0.0
-        if isinstance(avg_time_raw, list) and avg_time_raw:
+        if avg_time_raw and type(avg_time_raw) is list:
             try:
-                avg_time = round(float(avg_time_raw[0].get("value", 0)), 2)
-            except (TypeError, ValueError, IndexError):
+                avg_time = round(float(avg_time_raw[0]["value"]), 2)
+            except (KeyError, TypeError, ValueError):
                 pass
 
         hook_rate = round(video_views_3s / impressions, 4) if impressions > 0 else 0.0
@@ -211,16 +272,16 @@ def ad_insights_to_sheet_rows(items: list[dict[str, Any]]) -> list[dict[str, Any
             "Campaña": it.get("campaign_name", ""),
             "Fecha": date,
             "Inversión": spend,
-            "ATC": _extract_action(actions, "add_to_cart", "omni_add_to_cart"),
-            "IC": _extract_action(actions, "initiate_checkout", "omni_initiated_checkout"),
-            "Purchase": _extract_action(actions, "purchase", "omni_purchase"),
+            "ATC": _pick_action(action_index, "add_to_cart", "omni_add_to_cart"),
+            "IC": _pick_action(action_index, "initiate_checkout", "omni_initiated_checkout"),
+            "Purchase": _pick_action(action_index, "purchase", "omni_purchase"),
             "Impresiones": impressions,
-            "Clicks": _int(it.get("clicks")),
-            "Visitas": _int(it.get("inline_link_clicks")),
+            "Clicks": _to_int(it.get("clicks")),
+            "Visitas": _to_int(it.get("inline_link_clicks")),
             "Tiempo promedio": avg_time,
             "Hook Rate": hook_rate,
             "Hold Rate": hold_rate,
         })
 
-    rows.sort(key=lambda r: (r["Fecha"], r["Campaña"], r["Adset"], r["Ad"]))
+    rows.sort(key=_AD_ROW_SORT_KEY)
     return rows
@@ -67,6 +67,45 @@ def _google_ads_refresh_token(
     return str(token)
 
 
+def configure_parser(parser: argparse.ArgumentParser) -> None:
+    oauth_subparsers = parser.add_subparsers(dest="oauth_command", required=True)
+    google_ads_oauth = oauth_subparsers.add_parser(
+        "google-ads",
+        help="Create a Google Ads OAuth refresh token from a client_secret json.",
+    )
+    google_ads_oauth.add_argument(
+        "--client-secret",
+        required=True,
+        help="Path to OAuth client_secret JSON downloaded from Google Cloud Console.",
+    )
+    google_ads_oauth.add_argument(
+        "--no-browser",
+        action="store_true",
+        help="Do not open the browser automatically (prints a URL instead).",
+    )
+    google_ads_oauth.add_argument(
+        "--port",
+        type=int,
+        default=8080,
+        help="Local callback port for OAuth redirect (default: 8080).",
+    )
+    google_ads_oauth.add_argument(
+        "--env-file",
+        default=".env",
+        help="Write GOOGLE_ADS_OAUTH_REFRESH_TOKEN to this env file (default: .env).",
+    )
+    google_ads_oauth.add_argument(
+        "--stdout",
+        action="store_true",
+        help="Print the refresh token to stdout (recommended for pasting into a secret manager).",
+    )
+    google_ads_oauth.add_argument(
+        "--force",
+        action="store_true",
+        help="Overwrite GOOGLE_ADS_OAUTH_REFRESH_TOKEN in the env file even if already set.",
+    )
+
+
 def run_oauth_command(args: argparse.Namespace) -> None:
     if args.oauth_command != "google-ads":
         raise SystemExit(f"Unknown oauth command: {args.oauth_command}")
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
 
 from metrics_report.config import AppConfig
 from metrics_report.customers import sync_consolidado_customers
@@ -39,6 +41,32 @@ from metrics_report.webhook_db import get_counts
 
 
 _LOG = logging.getLogger(__name__)
+_MAX_PARALLEL_TASKS = 4
+# These share one Shopify GraphQL endpoint and token, whose THROTTLED responses are not
+# retried, so they run one after another in a single lane.
+_SHOPIFY_TASKS = frozenset({"shopify", "shopify_funnel", "customers"})
+
+
+def _run_task(label: str, body: Callable[[], None]) -> Exception | None:
+    try:
+        body()
+    except Exception as e:
+        _LOG.exception("%s task failed", label)
+        return e
+    return None
+
+
+def _run_lanes(lanes: list[list[tuple[str, Callable[[], None]]]]) -> list[Exception]:
+    # Lanes overlap; tasks within a lane run in order, and a failure does not stop the
+    # rest. Errors come back in lane order, then task order.
+    def run_lane(lane: list[tuple[str, Callable[[], None]]]) -> list[Exception | None]:
+        return [_run_task(label, body) for label, body in lane]
+
+    if not lanes:
+        return []
+    with ThreadPoolExecutor(max_workers=min(_MAX_PARALLEL_TASKS, len(lanes))) as pool:
+        results = list(pool.map(run_lane, lanes))
+    return [e for lane_results in results for e in lane_results if e is not None]
 
 
 def _require_max_date(sheet_name: str, max_date: str | None) -> str:
@@ -59,7 +87,7 @@ def _require_env(task: str, env_name: str, value: str) -> str:
     return value
 
 
-def run_pipeline(config: AppConfig, *, only: set[str] | None = None, dry_run: bool = False) -> None:
+def run_pipeline(config: AppConfig, *, only: frozenset[str] | None = None, dry_run: bool = False) -> None:
     sheets = GoogleSheetsClient(config.sheets.spreadsheet_id)
     last_date = _require_ymd("last_date", yesterday_ymd(config.timezone))
     errors: list[Exception] = []
@@ -83,262 +111,261 @@ def run_pipeline(config: AppConfig, *, only: set[str] | None = None, dry_run: bo
     if sheet_to_check:
         sheets.get_header(sheet_to_check)
 
-    if enabled("shopify"):
-        try:
-            max_info = sheets.get_max_ymd_in_column(
-                config.sheets.purchase_sheet,
-                date_headers=["Día", "Dia", "dia", "Fecha", "date"],
+    def shopify_task() -> None:
+        max_info = sheets.get_max_ymd_in_column(
+            config.sheets.purchase_sheet,
+            date_headers=["Día", "Dia", "dia", "Fecha", "date"],
+        )
+        max_saved = _require_max_date(config.sheets.purchase_sheet, max_info.max_date)
+        max_saved_date = parse_ymd(max_saved)
+        if not max_saved_date:
+            raise RuntimeError(f"Invalid date in sheet '{config.sheets.purchase_sheet}': {max_saved!r}")
+        start = add_days(max_saved_date, 1).isoformat()
+        end = _require_ymd("shopify end", last_date)
+        if start > end:
+            _LOG.info("Shopify: nothing to do (start=%s end=%s)", start, end)
+        else:
+            query = build_shopify_search_query(start_ymd=start, end_ymd=end)
+            orders = fetch_orders(
+                shop_domain=config.shopify.shop_domain,
+                api_version=config.shopify.api_version,
+                access_token=_require_env("shopify", "SHOPIFY_ACCESS_TOKEN", config.shopify.access_token),
+                query=query,
             )
-            max_saved = _require_max_date(config.sheets.purchase_sheet, max_info.max_date)
-            max_saved_date = parse_ymd(max_saved)
-            if not max_saved_date:
-                raise RuntimeError(f"Invalid date in sheet '{config.sheets.purchase_sheet}': {max_saved!r}")
-            start = add_days(max_saved_date, 1).isoformat()
-            end = _require_ymd("shopify end", last_date)
-            if start > end:
-                _LOG.info("Shopify: nothing to do (start=%s end=%s)", start, end)
-            else:
-                query = build_shopify_search_query(start_ymd=start, end_ymd=end)
-                orders = fetch_orders(
-                    shop_domain=config.shopify.shop_domain,
-                    api_version=config.shopify.api_version,
-                    access_token=_require_env("shopify", "SHOPIFY_ACCESS_TOKEN", config.shopify.access_token),
-                    query=query,
-                )
-                rows = aggregate_orders_to_rows(
-                    orders=orders,
-                    start_ymd=start,
-                    end_ymd=end,
-                    timezone=config.timezone,
-                    fixed_deduction_per_order=config.shopify.fixed_deduction_per_order,
-                    vat_factor=config.shopify.vat_factor,
-                )
-                if dry_run:
-                    _LOG.info("Shopify: dry-run, would append %d rows", len(rows))
-                else:
-                    sheets.append_rows(config.sheets.purchase_sheet, header=max_info.header, rows=rows)
-                    _LOG.info("Shopify: appended %d rows", len(rows))
-        except Exception as e:
-            _LOG.exception("Shopify task failed")
-            errors.append(e)
-
-    if enabled("shopify_funnel"):
-        try:
-            max_info = sheets.get_max_ymd_in_column(
-                config.sheets.shopi_sheet,
-                date_headers=["Día", "Dia", "dia", "Fecha", "date"],
+            rows = aggregate_orders_to_rows(
+                orders=orders,
+                start_ymd=start,
+                end_ymd=end,
+                timezone=config.timezone,
+                fixed_deduction_per_order=config.shopify.fixed_deduction_per_order,
+                vat_factor=config.shopify.vat_factor,
             )
-            max_saved = _require_max_date(config.sheets.shopi_sheet, max_info.max_date)
-            max_saved_date = parse_ymd(max_saved)
-            if not max_saved_date:
-                raise RuntimeError(f"Invalid date in sheet '{config.sheets.shopi_sheet}': {max_saved!r}")
-            start = add_days(max_saved_date, 1).isoformat()
-            end = _require_ymd("shopify_funnel end", last_date)
-            if start > end:
-                _LOG.info("Shopify funnel: nothing to do (start=%s end=%s)", start, end)
-            else:
-                db_path = config.webhook.db_path
-                counts = get_counts(db_path, start, end)
-
-                # Pivot webhook counts into {date: {metric: count}}
-                by_day: dict[str, dict[str, int]] = {}
-                for row in counts:
-                    d = str(row["date"])
-                    m = str(row["metric"])
-                    by_day.setdefault(d, {})[m] = int(row["count"])
-
-                # Fetch purchase counts from Shopify orders (more reliable than webhooks)
-                access_token = _require_env("shopify_funnel", "SHOPIFY_ACCESS_TOKEN", config.shopify.access_token)
-                query = build_shopify_search_query(start_ymd=start, end_ymd=end)
-                orders = fetch_orders(
-                    shop_domain=config.shopify.shop_domain,
-                    api_version=config.shopify.api_version,
-                    access_token=access_token,
-                    query=query,
-                )
-                # Count orders per day
-                for order in orders:
-                    created_at = order.get("createdAt")
-                    if not isinstance(created_at, str) or not created_at:
-                        continue
-                    day_key = datetime_to_ymd_in_tz(parse_iso_datetime(created_at), config.timezone)
-                    by_day.setdefault(day_key, {})["purchase"] = by_day.get(day_key, {}).get("purchase", 0) + 1
-
-                # Build rows for each day in range
-                start_date = parse_ymd(start)
-                end_date = parse_ymd(end)
-                if not start_date or not end_date:
-                    raise RuntimeError("Invalid start/end for shopify_funnel")
-                rows: list[dict[str, object]] = []
-                for day in daterange_inclusive(start_date, end_date):
-                    key = day.isoformat()
-                    day_data = by_day.get(key, {})
-                    rows.append({
-                        "Día": key,
-                        "Add to cart": day_data.get("add_to_cart", 0),
-                        "Begin Checkout": day_data.get("begin_checkout", 0),
-                        "Purchase": day_data.get("purchase", 0),
-                    })
-
-                if dry_run:
-                    _LOG.info("Shopify funnel: dry-run, would append %d rows", len(rows))
-                else:
-                    sheets.append_rows(config.sheets.shopi_sheet, header=max_info.header, rows=rows)
-                    _LOG.info("Shopify funnel: appended %d rows", len(rows))
-        except Exception as e:
-            _LOG.exception("Shopify funnel task failed")
-            errors.append(e)
-
-    if enabled("customers"):
-        try:
-            _require_env("customers", "SHOPIFY_ACCESS_TOKEN", config.shopify.access_token)
-            sync_consolidado_customers(config, end_ymd=last_date, dry_run=dry_run)
-        except Exception as e:
-            _LOG.exception("Customers task failed")
-            errors.append(e)
-
-    if enabled("meta"):
-        try:
-            max_info = sheets.get_max_ymd_in_column(config.sheets.meta_sheet, date_headers=["Fecha", "Día", "Dia"])
-            max_saved = _require_max_date(config.sheets.meta_sheet, max_info.max_date)
-            max_saved_date = parse_ymd(max_saved)
-            if not max_saved_date:
-                raise RuntimeError(f"Invalid date in sheet '{config.sheets.meta_sheet}': {max_saved!r}")
-            start = add_days(max_saved_date, 1).isoformat()
-            end = _require_ymd("meta end", last_date)
-            if start > end:
-                _LOG.info("Meta: nothing to do (start=%s end=%s)", start, end)
+            if dry_run:
+                _LOG.info("Shopify: dry-run, would append %d rows", len(rows))
             else:
-                insights = fetch_account_insights_by_day(
-                    api_version=config.meta.api_version,
-                    ad_account_id=config.meta.ad_account_id,
-                    access_token=_require_env("meta", "META_ACCESS_TOKEN", config.meta.access_token),
-                    since_ymd=start,
-                    until_ymd=end,
-                )
-                rows = insights_to_sheet_rows(insights)
-                if dry_run:
-                    _LOG.info("Meta: dry-run, would append %d rows", len(rows))
-                else:
-                    sheets.append_rows(config.sheets.meta_sheet, header=max_info.header, rows=rows)
-                    _LOG.info("Meta: appended %d rows", len(rows))
-        except Exception as e:
-            _LOG.exception("Meta task failed")
-            errors.append(e)
-
-    if enabled("meta_ads"):
-        try:
-            max_info = sheets.get_max_ymd_in_column(config.sheets.ads_sheet, date_headers=["Fecha", "Día", "Dia"])
-            if max_info.max_date:
-                max_saved_date = parse_ymd(max_info.max_date)
-                if not max_saved_date:
-                    raise RuntimeError(f"Invalid date in sheet '{config.sheets.ads_sheet}': {max_info.max_date!r}")
-                start = add_days(max_saved_date, 1).isoformat()
+                sheets.append_rows(config.sheets.purchase_sheet, header=max_info.header, rows=rows)
+                _LOG.info("Shopify: appended %d rows", len(rows))
+
+    def shopify_funnel_task() -> None:
+        max_info = sheets.get_max_ymd_in_column(
+            config.sheets.shopi_sheet,
+            date_headers=["Día", "Dia", "dia", "Fecha", "date"],
+        )
+        max_saved = _require_max_date(config.sheets.shopi_sheet, max_info.max_date)
+        max_saved_date = parse_ymd(max_saved)
+        if not max_saved_date:
+            raise RuntimeError(f"Invalid date in sheet '{config.sheets.shopi_sheet}': {max_saved!r}")
+        start = add_days(max_saved_date, 1).isoformat()
+        end = _require_ymd("shopify_funnel end", last_date)
+        if start > end:
+            _LOG.info("Shopify funnel: nothing to do (start=%s end=%s)", start, end)
+        else:
+            db_path = config.webhook.db_path
+            counts = get_counts(db_path, start, end)
+
+            # Pivot webhook counts into {date: {metric: count}}
+            by_day: dict[str, dict[str, int]] = {}
+            for row in counts:
+                d = str(row["date"])
+                m = str(row["metric"])
+                by_day.setdefault(d, {})[m] = int(row["count"])
+
+            # Fetch purchase counts from Shopify orders (more reliable than webhooks)
+            access_token = _require_env("shopify_funnel", "SHOPIFY_ACCESS_TOKEN", config.shopify.access_token)
+            query = build_shopify_search_query(start_ymd=start, end_ymd=end)
+            orders = fetch_orders(
+                shop_domain=config.shopify.shop_domain,
+                api_version=config.shopify.api_version,
+                access_token=access_token,
+                query=query,
+            )
+            # Count orders per day
+            for order in orders:
+                created_at = order.get("createdAt")
+                if not isinstance(created_at, str) or not created_at:
+                    continue
+                day_key = datetime_to_ymd_in_tz(parse_iso_datetime(created_at), config.timezone)
+                by_day.setdefault(day_key, {})["purchase"] = by_day.get(day_key, {}).get("purchase", 0) + 1
+
+            # Build rows for each day in range
+            start_date = parse_ymd(start)
+            end_date = parse_ymd(end)
+            if not start_date or not end_date:
+                raise RuntimeError("Invalid start/end for shopify_funnel")
+            rows: list[dict[str, object]] = []
+            for day in daterange_inclusive(start_date, end_date):
+                key = day.isoformat()
+                day_data = by_day.get(key, {})
+                rows.append({
+                    "Día": key,
+                    "Add to cart": day_data.get("add_to_cart", 0),
+                    "Begin Checkout": day_data.get("begin_checkout", 0),
+                    "Purchase": day_data.get("purchase", 0),
+                })
+
+            if dry_run:
+                _LOG.info("Shopify funnel: dry-run, would append %d rows", len(rows))
             else:
-                start = "2025-11-01"
-                _LOG.info("Meta Ads: empty sheet, backfilling from %s", start)
-            end = _require_ymd("meta_ads end", last_date)
-            if start > end:
-                _LOG.info("Meta Ads: nothing to do (start=%s end=%s)", start, end)
+                sheets.append_rows(config.sheets.shopi_sheet, header=max_info.header, rows=rows)
+                _LOG.info("Shopify funnel: appended %d rows", len(rows))
+
+    def customers_task() -> None:
+        _require_env("customers", "SHOPIFY_ACCESS_TOKEN", config.shopify.access_token)
+        sync_consolidado_customers(config, end_ymd=last_date, dry_run=dry_run)
+
+    def meta_task() -> None:
+        max_info = sheets.get_max_ymd_in_column(config.sheets.meta_sheet, date_headers=["Fecha", "Día", "Dia"])
+        max_saved = _require_max_date(config.sheets.meta_sheet, max_info.max_date)
+        max_saved_date = parse_ymd(max_saved)
+        if not max_saved_date:
+            raise RuntimeError(f"Invalid date in sheet '{config.sheets.meta_sheet}': {max_saved!r}")
+        start = add_days(max_saved_date, 1).isoformat()
+        end = _require_ymd("meta end", last_date)
+        if start > end:
+            _LOG.info("Meta: nothing to do (start=%s end=%s)", start, end)
+        else:
+            insights = fetch_account_insights_by_day(
+                api_version=config.meta.api_version,
+                ad_account_id=config.meta.ad_account_id,
+                access_token=_require_env("meta", "META_ACCESS_TOKEN", config.meta.access_token),
+                since_ymd=start,
+                until_ymd=end,
+            )
+            rows = insights_to_sheet_rows(insights, since_cutoff=max_saved)
+            del insights  # the raw Graph API rows aren't needed during the Sheets write
+            if dry_run:
+                _LOG.info("Meta: dry-run, would append %d rows", len(rows))
             else:
-                ad_insights = fetch_ad_insights_by_day(
-                    api_version=config.meta.api_version,
-                    ad_account_id=config.meta.ad_account_id,
-                    access_token=_require_env("meta_ads", "META_ACCESS_TOKEN", config.meta.access_token),
-                    since_ymd=start,
-                    until_ymd=end,
-                )
-                rows = ad_insights_to_sheet_rows(ad_insights)
-                if dry_run:
-                    _LOG.info("Meta Ads: dry-run, would append %d rows", len(rows))
-                else:
-                    sheets.append_rows(config.sheets.ads_sheet, header=max_info.header, rows=rows)
-                    _LOG.info("Meta Ads: appended %d rows", len(rows))
-        except Exception as e:
-            _LOG.exception("Meta Ads task failed")
-            errors.append(e)
-
-    if enabled("google_ads"):
-        try:
-            max_info = sheets.get_max_ymd_in_column(config.sheets.gads_sheet, date_headers=["Fecha", "Día", "Dia"])
-            max_saved = _require_max_date(config.sheets.gads_sheet, max_info.max_date)
-            max_saved_date = parse_ymd(max_saved)
+                sheets.append_rows(config.sheets.meta_sheet, header=max_info.header, rows=rows)
+                _LOG.info("Meta: appended %d rows", len(rows))
+
+    def meta_ads_task() -> None:
+        max_info = sheets.get_max_ymd_in_column(config.sheets.ads_sheet, date_headers=["Fecha", "Día", "Dia"])
+        if max_info.max_date:
+            max_saved_date = parse_ymd(max_info.max_date)
             if not max_saved_date:
-                raise RuntimeError(f"Invalid date in sheet '{config.sheets.gads_sheet}': {max_saved!r}")
+                raise RuntimeError(f"Invalid date in sheet '{config.sheets.ads_sheet}': {max_info.max_date!r}")
             start = add_days(max_saved_date, 1).isoformat()
-            end = _require_ymd("google_ads end", last_date)
-            if start > end:
-                _LOG.info("Google Ads: nothing to do (start=%s end=%s)", start, end)
+        else:
+            start = "2025-11-01"
+            _LOG.info("Meta Ads: empty sheet, backfilling from %s", start)
+        end = _require_ymd("meta_ads end", last_date)
+        if start > end:
+            _LOG.info("Meta Ads: nothing to do (start=%s end=%s)", start, end)
+        else:
+            ad_insights = fetch_ad_insights_by_day(
+                api_version=config.meta.api_version,
+                ad_account_id=config.meta.ad_account_id,
+                access_token=_require_env("meta_ads", "META_ACCESS_TOKEN", config.meta.access_token),
+                since_ymd=start,
+                until_ymd=end,
+            )
+            rows = ad_insights_to_sheet_rows(ad_insights, since_cutoff=max_info.max_date)
+            del ad_insights
+            if dry_run:
+                _LOG.info("Meta Ads: dry-run, would append %d rows", len(rows))
             else:
-                _require_env("google_ads", "GOOGLE_ADS_DEVELOPER_TOKEN", config.google_ads.developer_token)
-                access_token = get_google_ads_access_token(
-                    client_id=config.google_ads.oauth_client_id,
-                    client_secret=config.google_ads.oauth_client_secret,
-                    refresh_token=config.google_ads.oauth_refresh_token,
-                )
-                gaql = build_gaql_query(start_ymd=start, end_ymd=end)
-                results = google_ads_search(
-                    api_version=config.google_ads.api_version,
-                    customer_id=config.google_ads.customer_id,
-                    developer_token=config.google_ads.developer_token,
-                    login_customer_id=config.google_ads.login_customer_id,
-                    access_token=access_token,
-                    gaql=gaql,
-                )
-                rows = google_ads_rows(results)
-                if dry_run:
-                    _LOG.info("Google Ads: dry-run, would append %d rows", len(rows))
-                else:
-                    sheets.append_rows(config.sheets.gads_sheet, header=max_info.header, rows=rows)
-                    _LOG.info("Google Ads: appended %d rows", len(rows))
-        except Exception as e:
-            _LOG.exception("Google Ads task failed")
-            errors.append(e)
-
-    if enabled("klaviyo"):
-        try:
-            if not dry_run:
-                merged = sheets.consolidate_sum_by_date(
-                    config.sheets.klaviyo_sheet,
-                    date_headers=["Fecha", "Día", "Dia"],
-                    sum_headers=["Suscriptores"],
-                )
-                if merged:
-                    _LOG.info("Klaviyo: consolidated %d duplicate row(s) in sheet", merged)
-
-            max_info = sheets.get_max_ymd_in_column(config.sheets.klaviyo_sheet, date_headers=["Fecha", "Día", "Dia"])
-            max_saved = _require_max_date(config.sheets.klaviyo_sheet, max_info.max_date)
-            max_saved_date = parse_ymd(max_saved)
-            if not max_saved_date:
-                raise RuntimeError(f"Invalid date in sheet '{config.sheets.klaviyo_sheet}': {max_saved!r}")
-            last_date_obj = parse_ymd(last_date)
-            if not last_date_obj:
-                raise RuntimeError(f"Invalid last_date: {last_date!r}")
-            start = add_days(max_saved_date, 1).isoformat()
-            end_exclusive = add_days(last_date_obj, 1).isoformat()
-            if start >= end_exclusive:
-                _LOG.info("Klaviyo: nothing to do (start=%s end_exclusive=%s)", start, end_exclusive)
+                sheets.append_rows(config.sheets.ads_sheet, header=max_info.header, rows=rows)
+                _LOG.info("Meta Ads: appended %d rows", len(rows))
+
+    def google_ads_task() -> None:
+        max_info = sheets.get_max_ymd_in_column(config.sheets.gads_sheet, date_headers=["Fecha", "Día", "Dia"])
+        max_saved = _require_max_date(config.sheets.gads_sheet, max_info.max_date)
+        max_saved_date = parse_ymd(max_saved)
+        if not max_saved_date:
+            raise RuntimeError(f"Invalid date in sheet '{config.sheets.gads_sheet}': {max_saved!r}")
+        start = add_days(max_saved_date, 1).isoformat()
+        end = _require_ymd("google_ads end", last_date)
+        if start > end:
+            _LOG.info("Google Ads: nothing to do (start=%s end=%s)", start, end)
+        else:
+            _require_env("google_ads", "GOOGLE_ADS_DEVELOPER_TOKEN", config.google_ads.developer_token)
+            access_token = get_google_ads_access_token(
+                client_id=config.google_ads.oauth_client_id,
+                client_secret=config.google_ads.oauth_client_secret,
+                refresh_token=config.google_ads.oauth_refresh_token,
+            )
+            gaql = build_gaql_query(start_ymd=start, end_ymd=end)
+            results = google_ads_search(
+                api_version=config.google_ads.api_version,
+                customer_id=config.google_ads.customer_id,
+                developer_token=config.google_ads.developer_token,
+                login_customer_id=config.google_ads.login_customer_id,
+                access_token=access_token,
+                gaql=gaql,
+            )
+            rows = google_ads_rows(results)
+            if dry_run:
+                _LOG.info("Google Ads: dry-run, would append %d rows", len(rows))
             else:
-                body = build_metric_aggregates_body(
-                    metric_id=config.klaviyo.metric_id,
-                    start_ymd=start,
-                    end_exclusive_ymd=end_exclusive,
-                    timezone=config.timezone,
-                    by=config.klaviyo.by,
-                )
-                private_key = _require_env("klaviyo", "KLAVIYO_PRIVATE_KEY", config.klaviyo.private_key)
-                resp = fetch_metric_aggregates(private_key=private_key, revision=config.klaviyo.revision, body=body)
-                rows = metric_aggregates_to_sheet_rows(resp)
-                rows = [r for r in rows if r.get("Fecha", "") > max_saved]
-                if dry_run:
-                    _LOG.info("Klaviyo: dry-run, would append %d rows", len(rows))
-                else:
-                    if rows:
-                        sheets.append_rows(config.sheets.klaviyo_sheet, header=max_info.header, rows=rows)
-                    _LOG.info("Klaviyo: appended %d rows", len(rows))
-        except Exception as e:
-            _LOG.exception("Klaviyo task failed")
-            errors.append(e)
+                sheets.append_rows(config.sheets.gads_sheet, header=max_info.header, rows=rows)
+                _LOG.info("Google Ads: appended %d rows", len(rows))
+
+    def klaviyo_task() -> None:
+        if not dry_run:
+            merged = sheets.consolidate_sum_by_date(
+                config.sheets.klaviyo_sheet,
+                date_headers=["Fecha", "Día", "Dia"],
+                sum_headers=["Suscriptores"],
+            )
+            if merged:
+                _LOG.info("Klaviyo: consolidated %d duplicate row(s) in sheet", merged)
+
+        max_info = sheets.get_max_ymd_in_column(config.sheets.klaviyo_sheet, date_headers=["Fecha", "Día", "Dia"])
+        max_saved = _require_max_date(config.sheets.klaviyo_sheet, max_info.max_date)
+        max_saved_date = parse_ymd(max_saved)
+        if not max_saved_date:
+            raise RuntimeError(f"Invalid date in sheet '{config.sheets.klaviyo_sheet}': {max_saved!r}")
+        last_date_obj = parse_ymd(last_date)
+        if not last_date_obj:
+            raise RuntimeError(f"Invalid last_date: {last_date!r}")
+        start = add_days(max_saved_date, 1).isoformat()
+        end_exclusive = add_days(last_date_obj, 1).isoformat()
+        if start >= end_exclusive:
+            _LOG.info("Klaviyo: nothing to do (start=%s end_exclusive=%s)", start, end_exclusive)
+        else:
+            body = build_metric_aggregates_body(
+                metric_id=config.klaviyo.metric_id,
+                start_ymd=start,
+                end_exclusive_ymd=end_exclusive,
+                timezone=config.timezone,
+                by=config.klaviyo.by,
+            )
+            private_key = _require_env("klaviyo", "KLAVIYO_PRIVATE_KEY", config.klaviyo.private_key)
+            resp = fetch_metric_aggregates(private_key=private_key, revision=config.klaviyo.revision, body=body)
+            rows = metric_aggregates_to_sheet_rows(resp)
+            rows = [r for r in rows if r.get("Fecha", "") > max_saved]
+            if dry_run:
+                _LOG.info("Klaviyo: dry-run, would append %d rows", len(rows))
+            else:
+                if rows:
+                    sheets.append_rows(config.sheets.klaviyo_sheet, header=max_info.header, rows=rows)
+                _LOG.info("Klaviyo: appended %d rows", len(rows))
+
+    tasks: list[tuple[str, str, Callable[[], None]]] = [
+        ("shopify", "Shopify", shopify_task),
+        ("shopify_funnel", "Shopify funnel", shopify_funnel_task),
+        ("customers", "Customers", customers_task),
+        ("meta", "Meta", meta_task),
+        ("meta_ads", "Meta Ads", meta_ads_task),
+        ("google_ads", "Google Ads", google_ads_task),
+        ("klaviyo", "Klaviyo", klaviyo_task),
+    ]
+    # The Shopify-backed tasks share one lane; every other task gets its own. The tasks
+    # share one GoogleSheetsClient: its requests go through a thread-safe pooled session
+    # and each task touches only its own sheet.
+    lanes: list[list[tuple[str, Callable[[], None]]]] = []
+    shopify_lane: list[tuple[str, Callable[[], None]]] = []
+    for name, label, body in tasks:
+        if not enabled(name):
+            continue
+        if name in _SHOPIFY_TASKS:
+            if not shopify_lane:
+                lanes.append(shopify_lane)
+            shopify_lane.append((label, body))
+        else:
+            lanes.append([(label, body)])
+    errors.extend(_run_lanes(lanes))
 
     if errors:
         raise RuntimeError(f"Pipeline finished with {len(errors)} error(s)") from errors[0]
@@ -1,20 +1,31 @@
 from __future__ import annotations
 
+import functools
+import json
 import logging
 import os
-import re
+import time
 from dataclasses import dataclass
 from datetime import date, timedelta
+from math import isfinite
+from operator import itemgetter
 from pathlib import Path
-from typing import Any
+from typing import Any, Sequence
 
 import google.auth
-from googleapiclient.discovery import build
+import httplib2
+from google.auth.transport.requests import AuthorizedSession
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from requests.adapters import HTTPAdapter
 
 
 _LOG = logging.getLogger(__name__)
-_YMD_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
-_DMY_RE = re.compile(r"^(?P<d>\d{1,2})[/-](?P<m>\d{1,2})[/-](?P<y>\d{4})$")
+# A pipeline run is short; reads older than this are refetched even without a write.
+_READ_CACHE_TTL_S = 60.0
+_SCOPES = ("https://www.googleapis.com/auth/spreadsheets",)
+# Same per-request budget googleapiclient gives its default httplib2 transport.
+_HTTP_TIMEOUT_S = 60
 
 
 def _adc_credentials_path() -> Path | None:
@@ -51,13 +62,25 @@ def _maybe_load_local_credentials() -> None:
             return
 
 
+@functools.lru_cache(maxsize=1)
+def _sheets_discovery_doc() -> dict[str, Any]:
+    # google-api-python-client bundles the discovery documents; parse the Sheets one
+    # once per process instead of on every client construction.
+    doc = get_static_doc("sheets", "v4")
+    if doc is None:
+        raise RuntimeError("google-api-python-client is missing the bundled sheets v4 discovery document")
+    return json.loads(doc)
+
+
 def _quote_sheet(sheet_name: str) -> str:
-    if re.search(r"[\\s'!]", sheet_name):
-        return "'" + sheet_name.replace("'", "''") + "'"
-    return sheet_name
+    # Plain ASCII names ("META", "Consolidado") go unquoted; anything else (spaces,
+    # quotes, "!", punctuation, accents) is quoted, which the API always accepts.
+    if sheet_name.isascii() and sheet_name.replace("_", "").isalnum():
+        return sheet_name
+    return "'" + sheet_name.replace("'", "''") + "'"
 
 
-def _col_letter(col_index: int) -> str:
+def _col_letter_slow(col_index: int) -> str:
     if col_index < 0:
         raise ValueError("col_index must be >= 0")
     out = ""
@@ -68,6 +91,19 @@ def _col_letter(col_index: int) -> str:
     return out
 
 
+# A..ZZ covers every sheet this tool writes to.
+_COL_LETTERS = tuple(_col_letter_slow(i) for i in range(702))
+
+
+def _col_letter(col_index: int) -> str:
+    if 0 <= col_index < 702:
+        return _COL_LETTERS[col_index]
+    return _col_letter_slow(col_index)
+
+
+_SHEETS_EPOCH = date(1899, 12, 30)
+
+
 def _sheets_serial_to_date(value: float) -> date | None:
     # Google Sheets "date" serials are days since 1899-12-30.
     # See: https://support.google.com/docs/answer/3092969
@@ -79,30 +115,50 @@ def _sheets_serial_to_date(value: float) -> date | None:
         return None
     if days <= 0:
         return None
-    epoch = date(1899, 12, 30)
     try:
-        return epoch + timedelta(days=days)
+        return _SHEETS_EPOCH + timedelta(days=days)
     except (OverflowError, ValueError):
         return None
 
 
+def _is_ymd(s: str) -> bool:
+    return (
+        len(s) == 10
+        and s[4] == "-"
+        and s[7] == "-"
+        and s[:4].isdecimal()
+        and s[5:7].isdecimal()
+        and s[8:].isdecimal()
+    )
+
+
+def _dmy_to_ymd(s: str) -> str | None:
+    parts = s.replace("-", "/").split("/")
+    if len(parts) != 3:
+        return None
+    d, m, y = parts
+    if not (0 < len(d) <= 2 and 0 < len(m) <= 2 and len(y) == 4):
+        return None
+    if not (d.isdecimal() and m.isdecimal() and y.isdecimal()):
+        return None
+    try:
+        return date(int(y), int(m), int(d)).isoformat()
+    except ValueError:
+        return None
+
+
 def _coerce_cell_to_ymd(value: Any) -> str | None:
     if isinstance(value, str):
         s = value.strip()
         if not s:
             return None
-        if _YMD_RE.match(s):
+        if _is_ymd(s):
             return s
         # Common for Sheets locales: "21/12/2025" (dd/mm/yyyy) or "21-12-2025".
-        m = _DMY_RE.match(s)
-        if m:
-            try:
-                d = date(int(m.group("y")), int(m.group("m")), int(m.group("d")))
-                return d.isoformat()
-            except ValueError:
-                return None
+        if len(s) <= 10:
+            return _dmy_to_ymd(s)
         # Sometimes the API returns full datetimes; keep the date part if it looks ISO-ish.
-        if len(s) >= 10 and _YMD_RE.match(s[:10]):
+        if _is_ymd(s[:10]):
             return s[:10]
         return None
 
@@ -113,7 +169,45 @@ def _coerce_cell_to_ymd(value: Any) -> str | None:
     return None
 
 
+# Unformatted reads return every number in a date column as a plain number; serials
+# outside [2000-01-01, today + 1 year] are stray numbers (totals, IDs), not dates.
+_MIN_DATE_SERIAL = (date(2000, 1, 1) - _SHEETS_EPOCH).days
+_MAX_DATE_SERIAL_AHEAD_DAYS = 366
+
+
+def _date_serial_limit() -> int:
+    # Exclusive bound: fractional serials (datetimes) on the last allowed day still count.
+    return (date.today() - _SHEETS_EPOCH).days + _MAX_DATE_SERIAL_AHEAD_DAYS + 1
+
+
+def _max_ymd_in_cells(values: list[list[Any]]) -> str | None:
+    # Real date cells arrive as serials, so the max is taken on whole days and
+    # converted once; text cells (dates typed as plain strings) still go through parsing.
+    serial_limit = _date_serial_limit()
+    max_serial = 0.0
+    max_text: str | None = None
+    for row in values:
+        if not row:
+            continue
+        cell = row[0]
+        if type(cell) is int or type(cell) is float:
+            if _MIN_DATE_SERIAL <= cell < serial_limit and cell > max_serial:
+                max_serial = cell
+            continue
+        ymd = _coerce_cell_to_ymd(cell)
+        if ymd and (max_text is None or ymd > max_text):
+            max_text = ymd
+    serial_date = _sheets_serial_to_date(max_serial) if max_serial else None
+    max_date = serial_date.isoformat() if serial_date else None
+    if max_text is not None and (max_date is None or max_text > max_date):
+        max_date = max_text
+    return max_date
+
+
 def _coerce_cell_to_number(value: Any) -> float | None:
+    # Unformatted reads hand back plain ints/floats; check those before anything else.
+    if type(value) is float:
+        return value if isfinite(value) else None
     if value is None or isinstance(value, bool):
         return None
 
@@ -122,9 +216,7 @@ def _coerce_cell_to_number(value: Any) -> float | None:
             f = float(value)
         except (TypeError, ValueError, OverflowError):
             return None
-        if f != f or f in (float("inf"), float("-inf")):
-            return None
-        return f
+        return f if isfinite(f) else None
 
     if isinstance(value, str):
         s = value.strip()
@@ -135,13 +227,40 @@ def _coerce_cell_to_number(value: Any) -> float | None:
             f = float(s)
         except (TypeError, ValueError):
             return None
-        if f != f or f in (float("inf"), float("-inf")):
-            return None
-        return f
+        return f if isfinite(f) else None
 
     return None
 
 
+def _rows_to_matrix(sheet_name: str, *, header: list[str], rows: list[dict[str, Any]]) -> list[list[Any]]:
+    col_index = {name: i for i, name in enumerate(header)}
+    # Rows from one builder share a key order, so the key -> column mapping is
+    # resolved once per distinct key order rather than once per cell. When a row
+    # fills every column, it is read straight in header order with one itemgetter call.
+    full_getter = itemgetter(*header) if len(header) > 1 and len(col_index) == len(header) else None
+    layouts: dict[tuple[str, ...], list[int] | None] = {}
+    width = len(header)
+    values: list[list[Any]] = []
+    for row in rows:
+        keys = tuple(row)
+        if keys in layouts:
+            idxs = layouts[keys]
+        else:
+            missing = next((key for key in keys if key not in col_index), None)
+            if missing is not None:
+                raise ValueError(f"Sheet '{sheet_name}' missing column '{missing}'")
+            full = full_getter is not None and len(keys) == width
+            idxs = layouts[keys] = None if full else [col_index[key] for key in keys]
+        if idxs is None:
+            values.append(list(full_getter(row)))
+            continue
+        out: list[Any] = [""] * width
+        for idx, value in zip(idxs, row.values()):
+            out[idx] = value
+        values.append(out)
+    return values
+
+
 @dataclass(frozen=True)
 class MaxDateResult:
     header: list[str]
@@ -149,19 +268,70 @@ class MaxDateResult:
     max_date: str | None
 
 
+class _SessionHttp:
+    # Minimal httplib2.Http stand-in backed by a pooled, thread-safe requests session, so
+    # the discovery client can run requests from several pipeline tasks at once.
+    def __init__(self, session: AuthorizedSession):
+        self._session = session
+
+    def request(
+        self,
+        uri: str,
+        method: str = "GET",
+        body: Any = None,
+        headers: dict[str, str] | None = None,
+        **_kwargs: Any,
+    ) -> tuple[httplib2.Response, bytes]:
+        resp = self._session.request(method, uri, data=body, headers=headers, timeout=_HTTP_TIMEOUT_S)
+        info = {key.lower(): value for key, value in resp.headers.items()}
+        info["status"] = str(resp.status_code)
+        info["reason"] = resp.reason or ""
+        return httplib2.Response(info), resp.content
+
+
+@functools.lru_cache(maxsize=4)
+def _get_service(scopes: tuple[str, ...]) -> Any:
+    # One service (and connection pool) per process, shared by every client; only the
+    # spreadsheet id differs between them.
+    _maybe_load_local_credentials()
+    creds, project_id = google.auth.default(scopes=list(scopes))
+    quota_project_id = (
+        os.getenv("GOOGLE_CLOUD_QUOTA_PROJECT")
+        or os.getenv("GOOGLE_CLOUD_PROJECT")
+        or (project_id.strip() if isinstance(project_id, str) else "")
+    )
+    if quota_project_id and hasattr(creds, "with_quota_project"):
+        creds = creds.with_quota_project(quota_project_id)
+    session = AuthorizedSession(creds)
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+    return build_from_document(_sheets_discovery_doc(), http=_SessionHttp(session))
+
+
 class GoogleSheetsClient:
     def __init__(self, spreadsheet_id: str):
-        _maybe_load_local_credentials()
-        creds, project_id = google.auth.default(scopes=["https://www.googleapis.com/auth/spreadsheets"])
-        quota_project_id = (
-            os.getenv("GOOGLE_CLOUD_QUOTA_PROJECT")
-            or os.getenv("GOOGLE_CLOUD_PROJECT")
-            or (project_id.strip() if isinstance(project_id, str) else "")
-        )
-        if quota_project_id and hasattr(creds, "with_quota_project"):
-            creds = creds.with_quota_project(quota_project_id)
-        self._service = build("sheets", "v4", credentials=creds, cache_discovery=False)
+        # The spreadsheets().values() resource is built once; every call below hangs off it.
+        self._values = _get_service(_SCOPES).spreadsheets().values()
         self._spreadsheet_id = spreadsheet_id
+        # (kind, sheet_name, *args) -> (fetched_at, value); dropped for a sheet on any write to it.
+        # Reads return the cached lists themselves, so callers copy before mutating.
+        # Shared by the pipeline's task threads without a lock: every access below is a
+        # single dict operation, and each task reads and writes its own sheets only.
+        self._read_cache: dict[tuple[Any, ...], tuple[float, Any]] = {}
+
+    def _cache_get(self, key: tuple[Any, ...]) -> Any | None:
+        hit = self._read_cache.get(key)
+        if hit is None or time.monotonic() - hit[0] >= _READ_CACHE_TTL_S:
+            return None
+        return hit[1]
+
+    def _cache_put(self, key: tuple[Any, ...], value: Any) -> None:
+        self._read_cache[key] = (time.monotonic(), value)
+
+    def _invalidate(self, sheet_name: str) -> None:
+        # list() snapshots the keys in one step, so concurrent tasks can keep inserting.
+        for key in list(self._read_cache):
+            if key[1] == sheet_name:
+                self._read_cache.pop(key, None)
 
     def get_values(
         self,
@@ -171,24 +341,24 @@ class GoogleSheetsClient:
         value_render_option: str | None = None,
         date_time_render_option: str | None = None,
     ) -> list[list[Any]]:
+        key = ("values", sheet_name, a1_range, value_render_option, date_time_render_option)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
         sheet = _quote_sheet(sheet_name)
         kwargs: dict[str, Any] = {}
         if value_render_option is not None:
             kwargs["valueRenderOption"] = value_render_option
         if date_time_render_option is not None:
             kwargs["dateTimeRenderOption"] = date_time_render_option
-        resp = (
-            self._service.spreadsheets()
-            .values()
-            .get(
-                spreadsheetId=self._spreadsheet_id,
-                range=f"{sheet}!{a1_range}",
-                **kwargs,
-            )
-            .execute()
-        )
+        resp = self._values.get(
+            spreadsheetId=self._spreadsheet_id,
+            range=f"{sheet}!{a1_range}",
+            **kwargs,
+        ).execute()
         values = resp.get("values") or []
-        return list(values)
+        self._cache_put(key, values)
+        return values
 
     def update_values(
         self,
@@ -198,18 +368,14 @@ class GoogleSheetsClient:
         values: list[list[Any]],
         value_input_option: str = "USER_ENTERED",
     ) -> None:
+        self._invalidate(sheet_name)
         sheet = _quote_sheet(sheet_name)
-        (
-            self._service.spreadsheets()
-            .values()
-            .update(
-                spreadsheetId=self._spreadsheet_id,
-                range=f"{sheet}!{a1_range}",
-                valueInputOption=value_input_option,
-                body={"values": values},
-            )
-            .execute()
-        )
+        self._values.update(
+            spreadsheetId=self._spreadsheet_id,
+            range=f"{sheet}!{a1_range}",
+            valueInputOption=value_input_option,
+            body={"values": values},
+        ).execute()
 
     def batch_update_values(
         self,
@@ -220,31 +386,43 @@ class GoogleSheetsClient:
     ) -> None:
         if not updates:
             return
+        self._invalidate(sheet_name)
         sheet = _quote_sheet(sheet_name)
         data = [{"range": f"{sheet}!{a1_range}", "values": values} for a1_range, values in updates]
-        (
-            self._service.spreadsheets()
-            .values()
-            .batchUpdate(
-                spreadsheetId=self._spreadsheet_id,
-                body={
-                    "valueInputOption": value_input_option,
-                    "data": data,
-                },
-            )
-            .execute()
-        )
+        self._values.batchUpdate(
+            spreadsheetId=self._spreadsheet_id,
+            body={
+                "valueInputOption": value_input_option,
+                "data": data,
+            },
+        ).execute()
 
     def get_header(self, sheet_name: str) -> list[str]:
+        key = ("header", sheet_name)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
         sheet = _quote_sheet(sheet_name)
-        resp = (
-            self._service.spreadsheets()
-            .values()
-            .get(spreadsheetId=self._spreadsheet_id, range=f"{sheet}!1:1")
-            .execute()
-        )
+        resp = self._values.get(spreadsheetId=self._spreadsheet_id, range=f"{sheet}!1:1").execute()
         values = resp.get("values") or []
-        return list(values[0]) if values else []
+        header = values[0] if values else []
+        self._cache_put(key, header)
+        return header
+
+    def batch_get_headers(self, sheet_names: Sequence[str]) -> dict[str, list[str]]:
+        if not sheet_names:
+            return {}
+        resp = self._values.batchGet(
+            spreadsheetId=self._spreadsheet_id,
+            ranges=[f"{_quote_sheet(name)}!1:1" for name in sheet_names],
+        ).execute()
+        # valueRanges come back in the same order as the requested ranges.
+        out: dict[str, list[str]] = {}
+        for name, value_range in zip(sheet_names, resp.get("valueRanges") or []):
+            values = value_range.get("values") or []
+            out[name] = values[0] if values else []
+            self._cache_put(("header", name), out[name])
+        return out
 
     def get_max_ymd_in_column(self, sheet_name: str, *, date_headers: list[str]) -> MaxDateResult:
         header = self.get_header(sheet_name)
@@ -257,20 +435,13 @@ class GoogleSheetsClient:
 
         date_column = header[date_col_idx]
         letter = _col_letter(date_col_idx)
-        sheet = _quote_sheet(sheet_name)
-        resp = (
-            self._service.spreadsheets()
-            .values()
-            .get(spreadsheetId=self._spreadsheet_id, range=f"{sheet}!{letter}2:{letter}")
-            .execute()
+        values = self.get_values(
+            sheet_name,
+            f"{letter}2:{letter}",
+            value_render_option="UNFORMATTED_VALUE",
+            date_time_render_option="SERIAL_NUMBER",
         )
-        raw_values = [row[0] for row in (resp.get("values") or []) if row]
-        dates: list[str] = []
-        for cell in raw_values:
-            ymd = _coerce_cell_to_ymd(cell)
-            if ymd:
-                dates.append(ymd)
-        max_date = max(dates) if dates else None
+        max_date = _max_ymd_in_cells(values)
         return MaxDateResult(header=header, date_column=date_column, max_date=max_date)
 
     def consolidate_sum_by_date(
@@ -298,33 +469,50 @@ class GoogleSheetsClient:
         date_letter = _col_letter(date_col_idx)
         sum_letters = [_col_letter(idx) for idx in sum_col_indices]
 
-        date_values = self.get_values(sheet_name, f"{date_letter}2:{date_letter}")
-        sum_values = [self.get_values(sheet_name, f"{letter}2:{letter}") for letter in sum_letters]
-        data_rows = max([len(date_values)] + [len(col) for col in sum_values])
+        # One rectangular read over the needed columns; unformatted so dates arrive as
+        # serials and amounts as plain numbers regardless of the sheet's locale.
+        first_col = min(date_col_idx, *sum_col_indices)
+        last_col = max(date_col_idx, *sum_col_indices)
+        block = self.get_values(
+            sheet_name,
+            f"{_col_letter(first_col)}2:{_col_letter(last_col)}",
+            value_render_option="UNFORMATTED_VALUE",
+            date_time_render_option="SERIAL_NUMBER",
+        )
+        data_rows = len(block)
         if data_rows <= 0:
             return 0
 
-        occurrences: dict[str, int] = {}
+        date_pos = date_col_idx - first_col
+        sum_slots = tuple(enumerate(idx - first_col for idx in sum_col_indices))
+        coerce_number = _coerce_cell_to_number
+        serial_limit = _date_serial_limit()
         totals: dict[str, list[float]] = {}
-        for row_idx in range(data_rows):
-            date_cell = date_values[row_idx][0] if row_idx < len(date_values) and date_values[row_idx] else None
-            ymd = _coerce_cell_to_ymd(date_cell)
+        dated_rows = 0
+        for row in block:
+            width = len(row)
+            if width <= date_pos:
+                continue
+            cell = row[date_pos]
+            if (type(cell) is int or type(cell) is float) and not _MIN_DATE_SERIAL <= cell < serial_limit:
+                continue
+            ymd = _coerce_cell_to_ymd(cell)
             if not ymd:
                 continue
 
-            occurrences[ymd] = occurrences.get(ymd, 0) + 1
+            dated_rows += 1
             acc = totals.get(ymd)
             if acc is None:
-                acc = [0.0] * len(sum_headers)
-                totals[ymd] = acc
+                acc = totals[ymd] = [0.0] * len(sum_headers)
 
-            for col_idx, col in enumerate(sum_values):
-                cell = col[row_idx][0] if row_idx < len(col) and col[row_idx] else None
-                number = _coerce_cell_to_number(cell)
-                if number is not None:
-                    acc[col_idx] += number
+            for col_idx, pos in sum_slots:
+                if pos < width:
+                    number = coerce_number(row[pos])
+                    if number is not None:
+                        acc[col_idx] += number
 
-        duplicates_removed = sum(count - 1 for count in occurrences.values() if count > 1)
+        # Every dated row beyond the first for its date is a duplicate.
+        duplicates_removed = dated_rows - len(totals)
         if duplicates_removed <= 0:
             return 0
 
@@ -333,22 +521,22 @@ class GoogleSheetsClient:
                 return int(round(value))
             return value
 
-        sorted_dates = sorted(totals.keys())
-        rows_to_write = min(len(sorted_dates), data_rows)
-        padding = max(data_rows - rows_to_write, 0)
+        # (date, sums) pairs in date order, sliced once and shared by every column below.
+        sorted_totals = sorted(totals.items())[:data_rows]
+        padding = max(data_rows - len(sorted_totals), 0)
 
         updates: list[tuple[str, list[list[Any]]]] = []
         updates.append(
             (
                 f"{date_letter}2:{date_letter}{data_rows + 1}",
-                [[d] for d in sorted_dates[:rows_to_write]] + [[""]] * padding,
+                [[d] for d, _acc in sorted_totals] + [[""]] * padding,
             )
         )
         for idx, letter in enumerate(sum_letters):
             updates.append(
                 (
                     f"{letter}2:{letter}{data_rows + 1}",
-                    [[fmt(totals[d][idx])] for d in sorted_dates[:rows_to_write]] + [[""]] * padding,
+                    [[fmt(acc[idx])] for _d, acc in sorted_totals] + [[""]] * padding,
                 )
             )
 
@@ -359,28 +547,14 @@ class GoogleSheetsClient:
         if not rows:
             _LOG.info("No rows to append to sheet '%s'", sheet_name)
             return
+        self._invalidate(sheet_name)
 
-        col_index = {name: i for i, name in enumerate(header)}
-        values: list[list[Any]] = []
-        for row in rows:
-            out: list[Any] = [""] * len(header)
-            for key, value in row.items():
-                idx = col_index.get(key)
-                if idx is None:
-                    raise ValueError(f"Sheet '{sheet_name}' missing column '{key}'")
-                out[idx] = value
-            values.append(out)
-
+        values = _rows_to_matrix(sheet_name, header=header, rows=rows)
         sheet = _quote_sheet(sheet_name)
-        (
-            self._service.spreadsheets()
-            .values()
-            .append(
-                spreadsheetId=self._spreadsheet_id,
-                range=f"{sheet}!A1",
-                valueInputOption="USER_ENTERED",
-                insertDataOption="INSERT_ROWS",
-                body={"values": values},
-            )
-            .execute()
-        )
+        self._values.append(
+            spreadsheetId=self._spreadsheet_id,
+            range=f"{sheet}!A1",
+            valueInputOption="USER_ENTERED",
+            insertDataOption="INSERT_ROWS",
+            body={"values": values},
+        ).execute()
@@ -2,13 +2,12 @@ from __future__ import annotations
 
 import logging
 import math
-from collections import defaultdict
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterator
 
 from metrics_report.dates import (
     daterange_inclusive,
-    datetime_to_ymd_in_tz,
-    parse_iso_datetime,
+    iso_z_to_ymd_in_tz,
     parse_ymd,
 )
 from metrics_report.http import request_json
@@ -44,21 +43,30 @@ query OrdersByDay($query: String!, $cursor: String) {
 """
 
 
-def _pick_money(order: dict[str, Any]) -> tuple[float, str]:
-    money = (
-        ((order.get("totalPriceSet") or {}).get("shopMoney"))
-        or ((order.get("currentTotalPriceSet") or {}).get("shopMoney"))
-        or ((order.get("subtotalPriceSet") or {}).get("shopMoney"))
-        or ((order.get("currentSubtotalPriceSet") or {}).get("shopMoney"))
-    )
-    if not isinstance(money, dict):
-        return 0.0, "CLP"
+_MONEY_KEYS = ("totalPriceSet", "currentTotalPriceSet", "subtotalPriceSet", "currentSubtotalPriceSet")
+
+
+def _pick_shop_money(order: dict[str, Any]) -> Any:
+    # First non-empty shopMoney wins, in _MONEY_KEYS order.
+    for key in _MONEY_KEYS:
+        price_set = order.get(key)
+        if price_set:
+            money = price_set.get("shopMoney")
+            if money:
+                return money
+    return None
+
+
+def _money_amount(money: dict[str, Any]) -> float:
     try:
-        amount = float(money.get("amount") or 0)
+        return float(money.get("amount") or 0)
     except (TypeError, ValueError):
-        amount = 0.0
-    currency = str(money.get("currencyCode") or "CLP")
-    return amount, currency
+        return 0.0
+
+
+def _pick_money_amount(order: dict[str, Any]) -> float:
+    money = _pick_shop_money(order)
+    return _money_amount(money) if isinstance(money, dict) else 0.0
 
 
 def _round_half_away_from_zero(value: float) -> int:
@@ -87,49 +95,63 @@ def _coerce_int(value: Any) -> int | None:
     return None
 
 
-def fetch_orders(
+def iter_orders(
     *,
     shop_domain: str,
     api_version: str,
     access_token: str,
     query: str,
-) -> list[dict[str, Any]]:
+) -> Iterator[dict[str, Any]]:
     url = f"https://{shop_domain}/admin/api/{api_version}/graphql.json"
     headers = {"Content-Type": "application/json", "X-Shopify-Access-Token": access_token}
 
-    cursor: str | None = None
-    out: list[dict[str, Any]] = []
-    while True:
+    def fetch_page(cursor: str | None) -> dict[str, Any]:
         body = {"query": SHOPIFY_ORDERS_QUERY, "variables": {"query": query, "cursor": cursor}}
         resp = request_json("POST", url, headers=headers, json_body=body)
         if resp.get("errors"):
             raise RuntimeError(f"Shopify GraphQL errors: {resp['errors']}")
+        return ((resp.get("data") or {}).get("orders")) or {}
+
+    # Cursors are strictly sequential, but the next page can be in flight while the
+    # caller consumes the current one.
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        pending = executor.submit(fetch_page, None)
+        while pending is not None:
+            orders_conn = pending.result()
+            pending = None
+            page_info = orders_conn.get("pageInfo") or {}
+            cursor = page_info.get("endCursor")
+            if page_info.get("hasNextPage") and cursor:
+                pending = executor.submit(fetch_page, cursor)
+
+            for edge in orders_conn.get("edges") or []:
+                node = edge.get("node") if isinstance(edge, dict) else None
+                if isinstance(node, dict):
+                    yield node
 
-        orders_conn = ((resp.get("data") or {}).get("orders")) or {}
-        for edge in orders_conn.get("edges") or []:
-            node = (edge or {}).get("node")
-            if isinstance(node, dict):
-                out.append(node)
 
-        page_info = orders_conn.get("pageInfo") or {}
-        if not page_info.get("hasNextPage"):
-            break
-        cursor = page_info.get("endCursor")
-        if not cursor:
-            break
+def fetch_orders(
+    *,
+    shop_domain: str,
+    api_version: str,
+    access_token: str,
+    query: str,
+) -> list[dict[str, Any]]:
+    return list(
+        iter_orders(
+            shop_domain=shop_domain,
+            api_version=api_version,
+            access_token=access_token,
+            query=query,
+        )
+    )
+
 
-    return out
+_SEARCH_QUERY_TMPL = "created_at:>={start} created_at:<={end} financial_status:paid -status:cancelled"
 
 
 def build_shopify_search_query(*, start_ymd: str, end_ymd: str) -> str:
-    return " ".join(
-        [
-            f"created_at:>={start_ymd}",
-            f"created_at:<={end_ymd}",
-            "financial_status:paid",
-            "-status:cancelled",
-        ]
-    )
+    return _SEARCH_QUERY_TMPL.format(start=start_ymd, end=end_ymd)
 
 
 def aggregate_orders_to_rows(
@@ -146,51 +168,39 @@ def aggregate_orders_to_rows(
     if not start_date or not end_date:
         raise ValueError("Invalid start/end date")
 
-    by_day: dict[str, dict[str, float]] = defaultdict(
-        lambda: {
-            "orders_new": 0.0,
-            "orders_returning": 0.0,
-            "revenue_new_raw": 0.0,
-            "revenue_returning_raw": 0.0,
-        }
-    )
+    # date -> [orders_new, orders_returning, revenue_new_raw, revenue_returning_raw];
+    # the returning slots sit one past the new ones, so the cohort picks the offset.
+    by_day: dict[str, list[Any]] = {}
+    # The local day of a "...THH:MM:SSZ" timestamp only depends on its minute (tz
+    # offsets and DST switches fall on whole minutes), so orders share conversions.
+    day_by_minute: dict[str, str] = {}
 
     for order in orders:
         created_at = order.get("createdAt")
         if not isinstance(created_at, str) or not created_at:
             continue
 
-        date_key = datetime_to_ymd_in_tz(parse_iso_datetime(created_at), timezone)
-        amount, _currency = _pick_money(order)
+        minute = created_at[:16] if len(created_at) == 20 and created_at[-1] == "Z" else created_at
+        date_key = day_by_minute.get(minute)
+        if date_key is None:
+            date_key = day_by_minute[minute] = iso_z_to_ymd_in_tz(created_at, timezone)
+        amount = _pick_money_amount(order)
 
-        customer = order.get("customer") if isinstance(order.get("customer"), dict) else None
-        num_orders = customer.get("numberOfOrders") if customer else None
-        num_orders_int = _coerce_int(num_orders)
-        is_returning = bool(num_orders_int is not None and num_orders_int >= 2)
-        cohort = "returning" if is_returning else "new"
+        customer = order.get("customer")
+        num_orders_int = _coerce_int(customer.get("numberOfOrders")) if isinstance(customer, dict) else None
+        cohort = 1 if num_orders_int is not None and num_orders_int >= 2 else 0
 
-        acc = by_day[date_key]
-        if cohort == "returning":
-            acc["orders_returning"] += 1
-            acc["revenue_returning_raw"] += amount
-        else:
-            acc["orders_new"] += 1
-            acc["revenue_new_raw"] += amount
+        acc = by_day.get(date_key)
+        if acc is None:
+            acc = by_day[date_key] = [0, 0, 0.0, 0.0]
+        acc[cohort] += 1
+        acc[cohort + 2] += amount
 
+    empty = (0, 0, 0.0, 0.0)
     rows: list[dict[str, Any]] = []
     for day in daterange_inclusive(start_date, end_date):
         key = day.isoformat()
-        acc = by_day.get(key) or {
-            "orders_new": 0.0,
-            "orders_returning": 0.0,
-            "revenue_new_raw": 0.0,
-            "revenue_returning_raw": 0.0,
-        }
-
-        orders_new = int(acc["orders_new"])
-        orders_returning = int(acc["orders_returning"])
-        revenue_new_raw = float(acc["revenue_new_raw"])
-        revenue_returning_raw = float(acc["revenue_returning_raw"])
+        orders_new, orders_returning, revenue_new_raw, revenue_returning_raw = by_day.get(key, empty)
 
         revenue_new = _round_half_away_from_zero((revenue_new_raw - fixed_deduction_per_order * orders_new) / vat_factor)
         revenue_returning = _round_half_away_from_zero(
@@ -232,6 +242,13 @@ query ShopifyFunnel($query: String!) {
 
 
 _SHOPIFYQL_MIN_API_VERSION = "2025-10"
+_SHOPIFYQL_FUNNEL_TMPL = (
+    "FROM products "
+    "SHOW sum(view_cart_sessions) AS add_to_cart, "
+    "sum(view_cart_checkout_sessions) AS begin_checkout, "
+    "sum(view_cart_checkout_purchase_sessions) AS purchase "
+    "GROUP BY day SINCE {start} UNTIL {end} ORDER BY day ASC"
+)
 
 
 def fetch_funnel_by_day(
@@ -247,14 +264,7 @@ def fetch_funnel_by_day(
     url = f"https://{shop_domain}/admin/api/{effective_version}/graphql.json"
     headers = {"Content-Type": "application/json", "X-Shopify-Access-Token": access_token}
 
-    shopifyql = (
-        "FROM products "
-        "SHOW sum(view_cart_sessions) AS add_to_cart, "
-        "sum(view_cart_checkout_sessions) AS begin_checkout, "
-        "sum(view_cart_checkout_purchase_sessions) AS purchase "
-        f"GROUP BY day SINCE {start_ymd} UNTIL {end_ymd} ORDER BY day ASC"
-    )
-
+    shopifyql = _SHOPIFYQL_FUNNEL_TMPL.format(start=start_ymd, end=end_ymd)
     body = {"query": SHOPIFY_FUNNEL_QUERY, "variables": {"query": shopifyql}}
     resp = request_json("POST", url, headers=headers, json_body=body)
     if resp.get("errors"):
@@ -271,13 +281,8 @@ def fetch_funnel_by_day(
     col_names = [c.get("name", "") for c in columns]
     raw_rows = table_data.get("unformattedData") or table_data.get("rowData") or []
 
-    out: list[dict[str, Any]] = []
-    for row in raw_rows:
-        record: dict[str, Any] = {}
-        for i, val in enumerate(row):
-            if i < len(col_names):
-                record[col_names[i]] = val
-        out.append(record)
+    # zip() stops at the shorter side, dropping cells beyond the known columns.
+    out: list[dict[str, Any]] = [dict(zip(col_names, row)) for row in raw_rows]
 
     _LOG.info("ShopifyQL funnel returned %d day rows", len(out))
     return out
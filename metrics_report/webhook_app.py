@@ -1,15 +1,16 @@
 from __future__ import annotations
 
+import asyncio
 import base64
-import hashlib
 import hmac
 import logging
 import os
 
 from fastapi import FastAPI, Header, Request, Response
 
-from metrics_report.dates import datetime_to_ymd_in_tz, parse_iso_datetime
-from metrics_report.webhook_db import cleanup_old_carts, increment, try_record_cart
+from metrics_report.dates import iso_z_to_ymd_in_tz, today_in_tz
+from metrics_report.http import loads
+from metrics_report.webhook_db import cleanup_old_carts, increment, record_cart_and_increment
 
 _LOG = logging.getLogger(__name__)
 
@@ -18,70 +19,81 @@ app = FastAPI(docs_url=None, redoc_url=None)
 _TIMEZONE = os.getenv("REPORT_TIMEZONE", "America/Santiago")
 _DB_PATH = os.getenv("WEBHOOK_DB_PATH", "webhooks.db")
 _SECRET = os.getenv("SHOPIFY_WEBHOOK_SECRET", "")
+_SECRET_BYTES = _SECRET.encode()
 
 
 def _verify_hmac(body: bytes, header_hmac: str) -> bool:
     if not _SECRET:
         _LOG.warning("SHOPIFY_WEBHOOK_SECRET not set, skipping HMAC verification")
         return True
-    digest = hmac.new(_SECRET.encode(), body, hashlib.sha256).digest()
-    expected = base64.b64encode(digest).decode()
-    return hmac.compare_digest(expected, header_hmac)
+    # Base64 of a SHA-256 digest is always 44 characters; anything else cannot match.
+    if len(header_hmac) != 44:
+        return False
+    expected = base64.b64encode(hmac.digest(_SECRET_BYTES, body, "sha256"))
+    return hmac.compare_digest(expected, header_hmac.encode())
 
 
 def _extract_date(payload: dict) -> str:
     ts = payload.get("created_at") or payload.get("updated_at") or ""
     if not ts:
-        from metrics_report.dates import today_in_tz
-
         return today_in_tz(_TIMEZONE).isoformat()
-    return datetime_to_ymd_in_tz(parse_iso_datetime(ts), _TIMEZONE)
+    return iso_z_to_ymd_in_tz(ts, _TIMEZONE)
 
 
-@app.post("/carts_created")
-async def carts_created(
-    request: Request,
-    x_shopify_hmac_sha256: str = Header(""),
-) -> Response:
-    body = await request.body()
-    if not _verify_hmac(body, x_shopify_hmac_sha256):
-        return Response(status_code=401)
+# Verification, decoding and the SQLite write are blocking; the handlers run them in a
+# worker thread so the event loop keeps reading other requests meanwhile.
+def _handle_cart(body: bytes, header_hmac: str) -> int:
+    if not _verify_hmac(body, header_hmac):
+        return 401
 
     try:
-        payload = await request.json()
+        payload = loads(body)
     except Exception:
-        return Response(status_code=400)
+        return 400
 
     cart_token = str(payload.get("token") or payload.get("id") or "")
     if not cart_token:
-        return Response(status_code=200)
+        return 200
 
     date = _extract_date(payload)
-    if try_record_cart(_DB_PATH, cart_token, date):
-        increment(_DB_PATH, date, "add_to_cart")
+    if record_cart_and_increment(_DB_PATH, cart_token, date, "add_to_cart"):
         _LOG.info("add_to_cart: new cart %s on %s", cart_token[:8], date)
+    return 200
 
-    return Response(status_code=200)
 
-
-@app.post("/checkout_created")
-async def checkout_created(
-    request: Request,
-    x_shopify_hmac_sha256: str = Header(""),
-) -> Response:
-    body = await request.body()
-    if not _verify_hmac(body, x_shopify_hmac_sha256):
-        return Response(status_code=401)
+def _handle_checkout(body: bytes, header_hmac: str) -> int:
+    if not _verify_hmac(body, header_hmac):
+        return 401
 
     try:
-        payload = await request.json()
+        payload = loads(body)
     except Exception:
-        return Response(status_code=400)
+        return 400
 
     date = _extract_date(payload)
     increment(_DB_PATH, date, "begin_checkout")
     _LOG.info("begin_checkout on %s", date)
-    return Response(status_code=200)
+    return 200
+
+
+@app.post("/carts_created")
+async def carts_created(
+    request: Request,
+    x_shopify_hmac_sha256: str = Header(""),
+) -> Response:
+    body = await request.body()
+    status = await asyncio.to_thread(_handle_cart, body, x_shopify_hmac_sha256)
+    return Response(status_code=status)
+
+
+@app.post("/checkout_created")
+async def checkout_created(
+    request: Request,
+    x_shopify_hmac_sha256: str = Header(""),
+) -> Response:
+    body = await request.body()
+    status = await asyncio.to_thread(_handle_checkout, body, x_shopify_hmac_sha256)
+    return Response(status_code=status)
 
 
 @app.get("/health")
@@ -91,7 +103,7 @@ async def health() -> dict[str, str]:
 
 @app.on_event("startup")
 async def _startup_cleanup() -> None:
-    from metrics_report.dates import add_days, today_in_tz
+    from metrics_report.dates import add_days
 
     cutoff = add_days(today_in_tz(_TIMEZONE), -7).isoformat()
     deleted = cleanup_old_carts(_DB_PATH, cutoff)
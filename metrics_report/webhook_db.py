@@ -1,6 +1,12 @@
 from __future__ import annotations
 
 import sqlite3
+import threading
+
+_CONNECTIONS: dict[str, sqlite3.Connection] = {}
+# One connection per database file is shared by every request; sqlite3 connections
+# must not run statements from two threads at once.
+_LOCK = threading.Lock()
 
 
 def _ensure_tables(conn: sqlite3.Connection) -> None:
@@ -15,61 +21,66 @@ def _ensure_tables(conn: sqlite3.Connection) -> None:
             cart_token TEXT PRIMARY KEY,
             date TEXT NOT NULL
         );
+        CREATE INDEX IF NOT EXISTS idx_seen_carts_date ON seen_carts(date);
     """)
 
 
-def increment(db_path: str, date: str, metric: str) -> None:
-    conn = sqlite3.connect(db_path)
-    try:
-        _ensure_tables(conn)
-        conn.execute(
-            "INSERT INTO daily_counts (date, metric, count) VALUES (?, ?, 1) "
-            "ON CONFLICT(date, metric) DO UPDATE SET count = count + 1",
-            (date, metric),
-        )
-        conn.commit()
-    finally:
-        conn.close()
-
-
-def try_record_cart(db_path: str, cart_token: str, date: str) -> bool:
-    """Record a cart token. Returns True if the cart is new (not seen before)."""
-    conn = sqlite3.connect(db_path)
-    try:
+def _get_conn(db_path: str) -> sqlite3.Connection:
+    # Callers hold _LOCK. WAL lets the report CLI read counts while the webhook app writes.
+    conn = _CONNECTIONS.get(db_path)
+    if conn is None:
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
         _ensure_tables(conn)
-        try:
-            conn.execute(
-                "INSERT INTO seen_carts (cart_token, date) VALUES (?, ?)",
+        _CONNECTIONS[db_path] = conn
+    return conn
+
+
+def _increment(conn: sqlite3.Connection, date: str, metric: str) -> None:
+    conn.execute(
+        "INSERT INTO daily_counts (date, metric, count) VALUES (?, ?, 1) "
+        "ON CONFLICT(date, metric) DO UPDATE SET count = count + 1",
+        (date, metric),
+    )
+
+
+def increment(db_path: str, date: str, metric: str) -> None:
+    with _LOCK:
+        conn = _get_conn(db_path)
+        with conn:
+            _increment(conn, date, metric)
+
+
+def record_cart_and_increment(db_path: str, cart_token: str, date: str, metric: str) -> bool:
+    """Record a cart token and bump `metric` in one transaction when the cart is new."""
+    with _LOCK:
+        conn = _get_conn(db_path)
+        with conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO seen_carts (cart_token, date) VALUES (?, ?)",
                 (cart_token, date),
             )
-            conn.commit()
-            return True
-        except sqlite3.IntegrityError:
-            return False
-    finally:
-        conn.close()
+            if cursor.rowcount != 1:
+                return False
+            _increment(conn, date, metric)
+        return True
 
 
 def get_counts(db_path: str, start_date: str, end_date: str) -> list[dict[str, str | int]]:
-    conn = sqlite3.connect(db_path)
-    try:
-        _ensure_tables(conn)
-        rows = conn.execute(
+    with _LOCK:
+        rows = _get_conn(db_path).execute(
             "SELECT date, metric, count FROM daily_counts "
-            "WHERE date >= ? AND date <= ? ORDER BY date",
+            "WHERE date BETWEEN ? AND ? ORDER BY date, metric",
             (start_date, end_date),
         ).fetchall()
-        return [{"date": r[0], "metric": r[1], "count": r[2]} for r in rows]
-    finally:
-        conn.close()
+    return [{"date": r[0], "metric": r[1], "count": r[2]} for r in rows]
 
 
 def cleanup_old_carts(db_path: str, before_date: str) -> int:
-    conn = sqlite3.connect(db_path)
-    try:
-        _ensure_tables(conn)
-        cursor = conn.execute("DELETE FROM seen_carts WHERE date < ?", (before_date,))
-        conn.commit()
+    with _LOCK:
+        conn = _get_conn(db_path)
+        with conn:
+            cursor = conn.execute("DELETE FROM seen_carts WHERE date < ?", (before_date,))
         return cursor.rowcount
-    finally:
-        conn.close()
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
 
 from metrics_report.http import request_json
 
@@ -31,7 +33,7 @@ def register_webhooks(
     url = f"https://{shop_domain}/admin/api/{api_version}/graphql.json"
     headers = {"Content-Type": "application/json", "X-Shopify-Access-Token": access_token}
 
-    for topic, callback_url in WEBHOOK_TOPICS:
+    def register(topic: str, callback_url: str) -> dict[str, Any]:
         body = {
             "query": WEBHOOK_CREATE_MUTATION,
             "variables": {
@@ -42,7 +44,13 @@ def register_webhooks(
                 },
             },
         }
-        resp = request_json("POST", url, headers=headers, json_body=body)
+        return request_json("POST", url, headers=headers, json_body=body)
+
+    # The mutations are independent; send them together and report in topic order.
+    with ThreadPoolExecutor(max_workers=len(WEBHOOK_TOPICS)) as executor:
+        responses = list(executor.map(lambda item: register(*item), WEBHOOK_TOPICS))
+
+    for (topic, callback_url), resp in zip(WEBHOOK_TOPICS, responses):
         if resp.get("errors"):
             _LOG.error("GraphQL errors for %s: %s", topic, resp["errors"])
             continue
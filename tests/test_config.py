@@ -0,0 +1,80 @@
+import pytest
+
+from metrics_report import config
+
+
+# One secret per source, so a loaded source is told apart from one left at its defaults.
+_SOURCE_SECRETS = {
+    "shopify": ("SHOPIFY_ACCESS_TOKEN", lambda c: c.shopify.access_token),
+    "meta": ("META_ACCESS_TOKEN", lambda c: c.meta.access_token),
+    "google_ads": ("GOOGLE_ADS_DEVELOPER_TOKEN", lambda c: c.google_ads.developer_token),
+    "klaviyo": ("KLAVIYO_PRIVATE_KEY", lambda c: c.klaviyo.private_key),
+    "webhook": ("SHOPIFY_WEBHOOK_SECRET", lambda c: c.webhook.shopify_webhook_secret),
+}
+
+
+@pytest.fixture(autouse=True)
+def _fresh_env(monkeypatch):
+    for key in list(config.os.environ):
+        monkeypatch.delenv(key)
+    config._ENV_SNAPSHOT = None
+    config.load_config.cache_clear()
+    yield
+    config._ENV_SNAPSHOT = None
+    config.load_config.cache_clear()
+
+
+def _set_secrets(monkeypatch):
+    for source, (name, _get) in _SOURCE_SECRETS.items():
+        monkeypatch.setenv(name, f"{source}-secret")
+
+
+@pytest.mark.parametrize("task", sorted(config._TASK_SOURCES))
+def test_load_config_only_loads_task_sources(monkeypatch, task):
+    _set_secrets(monkeypatch)
+    monkeypatch.setenv("GOOGLE_SHEETS_META_SHEET", "META2")
+    cfg = config.load_config(frozenset({task}))
+    for source, (_name, get) in _SOURCE_SECRETS.items():
+        expected = f"{source}-secret" if source in config._TASK_SOURCES[task] else ""
+        assert get(cfg) == expected, source
+    # Sheets is always loaded.
+    assert cfg.sheets.meta_sheet == "META2"
+
+
+def test_load_config_without_only_loads_every_source(monkeypatch):
+    _set_secrets(monkeypatch)
+    cfg = config.load_config()
+    for source, (_name, get) in _SOURCE_SECRETS.items():
+        assert get(cfg) == f"{source}-secret", source
+
+
+def test_prefixed_variable_wins_over_bare_name(monkeypatch):
+    monkeypatch.setenv("META_ACCESS_TOKEN", "bare")
+    monkeypatch.setenv("LEJUSTE_META_ACCESS_TOKEN", " prefixed ")
+    monkeypatch.setenv("GOOGLE_SHEETS_ADS_SHEET", "ADS2")
+    cfg = config.load_config(frozenset({"meta"}))
+    assert cfg.meta.access_token == "prefixed"
+    assert cfg.sheets.ads_sheet == "ADS2"
+
+
+def test_blank_prefixed_variable_falls_back_to_default(monkeypatch):
+    # A blank LEJUSTE_ value still shadows the bare name, as it always has.
+    monkeypatch.setenv("META_API_VERSION", "v1.0")
+    monkeypatch.setenv("LEJUSTE_META_API_VERSION", "  ")
+    cfg = config.load_config(frozenset({"meta"}))
+    assert cfg.meta.api_version == config.MetaConfig().api_version
+
+
+def test_snapshot_and_cache_are_per_process(monkeypatch):
+    monkeypatch.setenv("META_ACCESS_TOKEN", "first")
+    first = config.load_config(frozenset({"meta"}))
+    assert config.load_config(frozenset({"meta"})) is first
+
+    # Later env changes are not seen, not even by a differently keyed load...
+    monkeypatch.setenv("LEJUSTE_META_ACCESS_TOKEN", "second")
+    assert config.load_config(frozenset({"meta", "shopify"})).meta.access_token == "first"
+
+    # ...until the snapshot and the cache are both reset.
+    config._ENV_SNAPSHOT = None
+    config.load_config.cache_clear()
+    assert config.load_config(frozenset({"meta"})).meta.access_token == "second"
@@ -0,0 +1,110 @@
+import re
+
+import pytest
+
+pytest.importorskip("googleapiclient")
+
+from metrics_report import customers  # noqa: E402
+from metrics_report.config import AppConfig  # noqa: E402
+
+
+HEADER = [*customers.DEFAULT_CONSOLIDADO_HEADER, *customers.INTERNAL_COLUMNS]
+
+
+def _col(letters: str) -> int:
+    idx = 0
+    for ch in letters:
+        idx = idx * 26 + ord(ch) - ord("A") + 1
+    return idx - 1
+
+
+class _FakeSheets:
+    # Holds one sheet as a row matrix and applies batchUpdate ranges onto it.
+    def __init__(self, rows):
+        self.rows = [list(row) for row in rows]
+        self.batches = []
+
+    def get_header(self, sheet_name):
+        return list(self.rows[0]) if self.rows else []
+
+    def get_values(self, sheet_name, a1_range, **kwargs):
+        return [list(row) for row in self.rows]
+
+    def batch_update_values(self, sheet_name, *, updates, value_input_option="USER_ENTERED"):
+        self.batches.append(updates)
+        for a1_range, values in updates:
+            m = re.fullmatch(r"([A-Z]+)(\d+)(?::[A-Z]+\d+)?", a1_range)
+            col, row = _col(m.group(1)), int(m.group(2)) - 1
+            for r, value_row in enumerate(values, start=row):
+                while len(self.rows) <= r:
+                    self.rows.append([])
+                target = self.rows[r]
+                if len(target) < col + len(value_row):
+                    target.extend([""] * (col + len(value_row) - len(target)))
+                target[col : col + len(value_row)] = value_row
+
+
+def _order(email, created_at, amount, *, discount="0", name="", phone=""):
+    return {
+        "createdAt": created_at,
+        "customer": {"email": email, "displayName": name, "phone": phone},
+        "totalPriceSet": {"shopMoney": {"amount": amount, "currencyCode": "CLP"}},
+        "currentTotalDiscountsSet": {"shopMoney": {"amount": discount}},
+    }
+
+
+def _sync(monkeypatch, sheet, orders, *, end_ymd="2025-03-10"):
+    queries = []
+
+    def fake_iter_orders(**kwargs):
+        queries.append(kwargs["query"])
+        return iter(orders)
+
+    monkeypatch.setattr(customers, "GoogleSheetsClient", lambda spreadsheet_id: sheet)
+    monkeypatch.setattr(customers, "iter_orders", fake_iter_orders)
+    customers.sync_consolidado_customers(AppConfig(), end_ymd=end_ymd)
+    return queries
+
+
+def test_sync_updates_existing_rows_and_appends_below_last_row(monkeypatch):
+    sheet = _FakeSheets(
+        [
+            HEADER,
+            ["Alice", "alice@x.com", "+1", 2, 9, 100, "Media", "gift", "", "", "2025-03-01", 1, 2, 100.0],
+            [],
+            ["Bob", "bob@x.com", "+2", 1, 10, 50, "Baja", "", "", "", "2025-02-20", 0, 1, 50.0],
+        ]
+    )
+    orders = [
+        _order("alice@x.com", "2025-03-05T15:00:00Z", "119"),
+        _order("Carol@X.com", "2025-03-06T02:00:00Z", "238", discount="10", name="Carol", phone="+3"),
+    ]
+
+    queries = _sync(monkeypatch, sheet, orders)
+
+    assert len(queries) == 1 and "2025-03-02" in queries[0]
+    # One batchUpdate, no header rewrite, updated spans over the three data rows.
+    assert len(sheet.batches) == 1
+    assert [a1 for a1, _values in sheet.batches[0]] == ["D2:G4", "K2:N4", "A5:N5"]
+    assert sheet.rows[1] == ["Alice", "alice@x.com", "+1", 3, 5, 200, "Baja", "gift", "", "", "2025-03-05", 1, 3, 200.0]
+    assert sheet.rows[2][3:7] == ["", "", "", ""]
+    assert sheet.rows[3] == ["Bob", "bob@x.com", "+2", 1, 18, 50, "Baja", "", "", "", "2025-02-20", 0, 1, 50.0]
+    assert sheet.rows[4] == ["Carol", "carol@x.com", "+3", 1, 5, 200, "Alta", "", "", "", "2025-03-05", 1, 1, 200.0]
+    assert len(sheet.rows) == 5
+
+
+def test_sync_empty_sheet_writes_header_and_rows_from_row_two(monkeypatch):
+    sheet = _FakeSheets([])
+    orders = [
+        _order("bob@x.com", "2025-03-04T12:00:00Z", "119", name="Bob"),
+        _order("alice@x.com", "2025-03-05T12:00:00Z", "238", name="Alice"),
+    ]
+
+    queries = _sync(monkeypatch, sheet, orders)
+
+    assert queries == ["created_at:<=2025-03-10 financial_status:paid -status:cancelled"]
+    assert [a1 for a1, _values in sheet.batches[0]] == ["A1", "A2:N3"]
+    assert sheet.rows[0] == HEADER
+    # New customers are written in email order.
+    assert [row[1] for row in sheet.rows[1:]] == ["alice@x.com", "bob@x.com"]
+    assert sheet.rows[1][3:7] == [1, 5, 200, "Baja"]
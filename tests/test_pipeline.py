@@ -0,0 +1,36 @@
+import threading
+
+import pytest
+
+pytest.importorskip("googleapiclient")
+
+from metrics_report import pipeline  # noqa: E402
+
+
+def test_failing_task_does_not_hide_other_results():
+    ran = []
+    lock = threading.Lock()
+
+    def task(name, error=None):
+        def body():
+            with lock:
+                ran.append(name)
+            if error is not None:
+                raise error
+
+        return name, body
+
+    shopify_error = RuntimeError("shopify throttled")
+    meta_error = ValueError("meta down")
+    lanes = [
+        [task("shopify", shopify_error), task("shopify_funnel"), task("customers")],
+        [task("meta", meta_error)],
+        [task("google_ads")],
+    ]
+
+    errors = pipeline._run_lanes(lanes)
+
+    # Every task ran, including the ones after the failure in the same lane.
+    assert sorted(ran) == ["customers", "google_ads", "meta", "shopify", "shopify_funnel"]
+    assert errors == [shopify_error, meta_error]
+
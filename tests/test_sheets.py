@@ -0,0 +1,65 @@
+from datetime import date, timedelta
+
+import pytest
+
+pytest.importorskip("googleapiclient")
+
+from metrics_report.sheets import GoogleSheetsClient, _max_ymd_in_cells  # noqa: E402
+
+
+def _serial(d: date) -> int:
+    return (d - date(1899, 12, 30)).days
+
+
+class _FakeSheets(GoogleSheetsClient):
+    def __init__(self, header, block):
+        self._header = header
+        self._block = block
+        self.updates = None
+
+    def get_header(self, sheet_name):
+        return self._header
+
+    def get_values(self, sheet_name, a1_range, **kwargs):
+        return self._block
+
+    def batch_update_values(self, sheet_name, *, updates, value_input_option="USER_ENTERED"):
+        self.updates = updates
+
+
+def test_max_ymd_prefers_latest_date_serial():
+    values = [[_serial(date(2025, 3, 1))], [_serial(date(2025, 3, 4))], [], [_serial(date(2025, 3, 2))]]
+    assert _max_ymd_in_cells(values) == "2025-03-04"
+
+
+def test_max_ymd_ignores_non_date_numbers():
+    # A total row or a pasted order id must not become the sheet's latest date.
+    far_future = _serial(date.today() + timedelta(days=5 * 365))
+    values = [[_serial(date(2025, 3, 4))], [far_future], [1250.75], [5_812_345_678_901], [0]]
+    assert _max_ymd_in_cells(values) == "2025-03-04"
+
+
+def test_max_ymd_mixes_serials_and_text_dates():
+    values = [[_serial(date(2025, 3, 4))], ["2025-03-05"], ["06/03/2025"], ["Total"]]
+    assert _max_ymd_in_cells(values) == "2025-03-06"
+
+
+def test_max_ymd_empty_column():
+    assert _max_ymd_in_cells([[], [""], ["Total"]]) is None
+
+
+def test_consolidate_skips_non_date_numbers():
+    # A bare 1250 in the date column must not be rewritten as 1903-06-03.
+    block = [
+        [_serial(date(2025, 3, 4)), 10],
+        [_serial(date(2025, 3, 4)), 5],
+        [_serial(date(2025, 3, 5)), 7],
+        [1250, 22],
+    ]
+    sheets = _FakeSheets(["Fecha", "Revenue"], block)
+    removed = sheets.consolidate_sum_by_date("Klaviyo", date_headers=["Fecha"], sum_headers=["Revenue"])
+    assert removed == 1
+    assert sheets.updates == [
+        ("A2:A5", [["2025-03-04"], ["2025-03-05"], [""], [""]]),
+        ("B2:B5", [[15], [7], [""], [""]]),
+    ]